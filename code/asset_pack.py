@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import pygame
+from settings import *
+from support import get_path, natural_key, assets
+
+# file layout: header, json index, then raw BGRA pixels of every sheet
+MAGIC = b'RPGPACK1'
+HEADER = struct.Struct('<8sI')
+ALIGN = 16
+
+
+def pack_key(path, flip=False):
+    # folders are stored relative to the code directory so a pack is portable
+    key = os.path.relpath(os.path.normpath(get_path(path)), get_path('.')).replace(os.sep, '/')
+    return key + '@flip' if flip else key
+
+
+def collect_folders():
+    folders = []
+    for root in ATLAS_FOLDERS:
+        for folder, dirs, files in os.walk(get_path(root)):
+            dirs.sort(key=natural_key)
+            if any(name.endswith('.png') for name in files):
+                folders.append((folder, False))
+    folders += [(get_path(path), True) for path in ATLAS_FLIPPED]
+    return folders
+
+
+def load_frames(folder, flip):
+    names = sorted((name for name in os.listdir(folder) if name.endswith('.png')), key=natural_key)
+    frames = [pygame.image.load(os.path.join(folder, name)).convert_alpha() for name in names]
+    if flip:
+        frames = [pygame.transform.flip(frame, True, False) for frame in frames]
+    return frames
+
+
+def source_times():
+    # modification time of every png the pack is built from, so a pack that
+    # is older than its sources can be told apart
+    times = {}
+    for folder, _ in collect_folders():
+        for name in os.listdir(folder):
+            if name.endswith('.png'):
+                path = os.path.join(folder, name)
+                times[pack_key(path)] = os.stat(path).st_mtime_ns
+    return times
+
+
+class ShelfPacker:
+    # fills sheets row by row; frames go in tallest first so rows stay tight
+    def __init__(self, size):
+        self.size = size
+        self.sheets = []
+
+    def new_sheet(self):
+        self.sheets.append({'x': 0, 'y': 0, 'row_height': 0})
+
+    def place(self, width, height):
+        if width > self.size or height > self.size:
+            raise ValueError(f'frame of {width}x{height} does not fit a {self.size} atlas')
+        if not self.sheets:
+            self.new_sheet()
+        sheet = self.sheets[-1]
+        if sheet['x'] + width > self.size:
+            sheet['x'] = 0
+            sheet['y'] += sheet['row_height']
+            sheet['row_height'] = 0
+        if sheet['y'] + height > self.size:
+            self.new_sheet()
+            sheet = self.sheets[-1]
+        pos = (len(self.sheets) - 1, sheet['x'], sheet['y'])
+        sheet['x'] += width
+        sheet['row_height'] = max(sheet['row_height'], height)
+        return pos
+
+
+def build_pack(output=ASSET_PACK_PATH, size=ATLAS_SIZE):
+    frames = []
+    index = {'folders': {}, 'sheets': [], 'sources': source_times()}
+    for folder, flip in collect_folders():
+        key = pack_key(folder, flip)
+        index['folders'][key] = []
+        for number, frame in enumerate(load_frames(folder, flip)):
+            frames.append((key, number, frame))
+            index['folders'][key].append(None)
+
+    packer = ShelfPacker(size)
+    placed = []
+    for key, number, frame in sorted(frames, key=lambda item: -item[2].get_height()):
+        sheet, x, y = packer.place(*frame.get_size())
+        placed.append((sheet, x, y, frame))
+        index['folders'][key][number] = [sheet, x, y, *frame.get_size()]
+
+    sheets = []
+    for sheet_data in packer.sheets:
+        height = sheet_data['y'] + sheet_data['row_height']
+        sheets.append(pygame.Surface((size, max(height, 1)), pygame.SRCALPHA))
+    for sheet, x, y, frame in placed:
+        # max blending onto the empty sheet copies the pixels untouched
+        sheets[sheet].blit(frame, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+
+    offset = 0
+    pixels = []
+    for sheet in sheets:
+        data = pygame.image.tobytes(sheet, 'BGRA')
+        index['sheets'].append({'offset': offset, 'size': sheet.get_size()})
+        pixels.append(data)
+        offset += len(data)
+
+    index_data = json.dumps(index, separators=(',', ':')).encode()
+    index_data += b' ' * (-(HEADER.size + len(index_data)) % ALIGN)
+    with open(get_path(output), 'wb') as pack_file:
+        pack_file.write(HEADER.pack(MAGIC, len(index_data)))
+        pack_file.write(index_data)
+        for data in pixels:
+            pack_file.write(data)
+    return len(frames), len(sheets)
+
+
+class AssetPack:
+    # the pack stays memory-mapped; every sheet is a surface over the mapped
+    # pixels and every frame a subsurface of its sheet, so nothing is decoded
+    def __init__(self, path):
+        with open(path, 'rb') as pack_file:
+            self.map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an asset pack')
+        index = json.loads(bytes(self.map[HEADER.size:HEADER.size + index_length]))
+        pixels = memoryview(self.map)[HEADER.size + index_length:]
+
+        self.sheets = []
+        for sheet in index['sheets']:
+            width, height = sheet['size']
+            data = pixels[sheet['offset']:sheet['offset'] + width * height * 4]
+            self.sheets.append(pygame.image.frombuffer(data, (width, height), 'BGRA'))
+        self.folders = index['folders']
+        self.sources = index.get('sources')
+
+    def get_folder(self, path, flip=False):
+        entries = self.folders.get(pack_key(path, flip))
+        if entries is None:
+            return None
+        return [self.sheets[sheet].subsurface((x, y, width, height)) for sheet, x, y, width, height in entries]
+
+
+def load_pack(path=ASSET_PACK_PATH):
+    # the pack is optional: without it, or when a png changed since it was
+    # built, the registry decodes the pngs
+    path = get_path(path)
+    if assets.pack is None and os.path.exists(path):
+        pack = AssetPack(path)
+        if pack.sources == source_times():
+            assets.use_pack(pack)
+
+
+if __name__ == '__main__':
+    # offline step: python asset_pack.py [output]
+    pygame.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    output = sys.argv[1] if len(sys.argv) > 1 else ASSET_PACK_PATH
+    frame_count, sheet_count = build_pack(output)
+    print(f'packed {frame_count} frames into {sheet_count} sheets: {get_path(output)}')
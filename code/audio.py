@@ -0,0 +1,94 @@
+import os
+import pygame
+from settings import *
+from support import get_path
+
+
+class AudioBank:
+    # every sound file is decoded once and shared; playback is capped per
+    # sound and scaled by the distance to the listener (the camera centre)
+    def __init__(self):
+        self.sounds = {}
+        self.listener = None
+
+    def get_sound(self, path):
+        key = os.path.normpath(get_path(path))
+        sound = self.sounds.get(key)
+        if sound is None:
+            sound = pygame.mixer.Sound(key)
+            self.sounds[key] = sound
+        return sound
+
+    def set_listener(self, pos):
+        self.listener = pygame.math.Vector2(pos)
+
+    def play(self, path, volume=1.0, pos=None, max_voices=MAX_VOICES_PER_SOUND):
+        if pos is not None and self.listener is not None:
+            distance = self.listener.distance_to(pos)
+            if distance >= HEARING_RADIUS:
+                return None
+            volume *= 1 - distance / HEARING_RADIUS
+
+        sound = self.get_sound(path)
+        if sound.get_num_channels() >= max_voices:
+            return None
+        channel = sound.play()
+        if channel:
+            channel.set_volume(volume)
+        return channel
+
+
+audio = AudioBank()
+
+
+MUSIC_END = pygame.USEREVENT + 1
+
+
+class MusicPlayer:
+    # background music is streamed from disk with pygame.mixer.music instead
+    # of being decoded into a Sound; changing tracks fades the old one out
+    # and the next one in
+    def __init__(self):
+        self.playlist = []
+        self.index = 0
+        self.current = None
+        self.pending = None
+
+    def play_level(self, level_name):
+        self.play_playlist(level_music[level_name])
+
+    def play_playlist(self, tracks):
+        tracks = list(tracks)
+        if tracks == self.playlist and pygame.mixer.music.get_busy():
+            return  # already playing, e.g. after a restart
+        self.playlist = tracks
+        self.index = 0
+        self.switch_to(tracks[0])
+
+    def switch_to(self, path):
+        if pygame.mixer.music.get_busy():
+            # the new track starts from handle_event once this one is gone
+            self.pending = path
+            pygame.mixer.music.fadeout(MUSIC_FADE)
+        else:
+            self.start(path)
+
+    def start(self, path):
+        pygame.mixer.music.set_endevent(MUSIC_END)
+        pygame.mixer.music.load(get_path(path))
+        pygame.mixer.music.set_volume(MUSIC_VOLUME)
+        pygame.mixer.music.play(fade_ms=MUSIC_FADE)
+        self.current = path
+
+    def handle_event(self, event):
+        if event.type != MUSIC_END:
+            return
+        if self.pending:
+            path, self.pending = self.pending, None
+            self.start(path)
+        elif self.playlist:
+            self.index = (self.index + 1) % len(self.playlist)
+            self.start(self.playlist[self.index])
+
+
+music = MusicPlayer()
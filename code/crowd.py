@@ -0,0 +1,30 @@
+from math import hypot
+from settings import *
+from spatial import SpatialHash
+
+
+def separate(enemies, radius=SEPARATION_RADIUS, weight=SEPARATION_WEIGHT):
+    # chasing enemies steer away from neighbours closer than radius; the hash
+    # is rebuilt every frame so each enemy only looks at the cells around it
+    index = SpatialHash(radius)
+    for enemy in enemies:
+        index.insert(enemy, enemy.hitbox)
+
+    for enemy in enemies:
+        if enemy.status != 'move':
+            continue
+        x, y = enemy.pos
+        push_x = push_y = 0
+        for other in index.query(enemy.hitbox.inflate(radius * 2, radius * 2)):
+            if other is enemy:
+                continue
+            offset_x, offset_y = x - other.pos.x, y - other.pos.y
+            distance = hypot(offset_x, offset_y)
+            if 0 < distance < radius:
+                # the closer the neighbour, the harder the push
+                strength = (radius - distance) / (radius * distance)
+                push_x += offset_x * strength
+                push_y += offset_y * strength
+        if push_x or push_y:
+            enemy.direction.x += push_x * weight
+            enemy.direction.y += push_y * weight
@@ -0,0 +1,39 @@
+import pygame
+from collections import Counter
+from random import choice
+from settings import *
+
+
+class SpawnDirector:
+    # brings monsters back over time: every SPAWN_INTERVAL ms one enemy is
+    # spawned at a map spawn point in a streamed-in chunk that is below its
+    # population cap, out of the player's sight and clear of every live
+    # enemy's hitbox, so monsters never pile up on one spot
+    def __init__(self, world, level_data):
+        self.world = world
+        self.spawn_time = pygame.time.get_ticks()
+        self.points = {}
+        for entity_id, col, row in level_data.spawns:
+            if entity_id != PLAYER_ID:
+                pos = (col * TILESIZE, row * TILESIZE)
+                self.points.setdefault(world.chunk_at(pos), []).append((entity_ids.get(entity_id, 'squid'), pos))
+
+    def update(self, player_pos, view_rect):
+        current_time = pygame.time.get_ticks()
+        if current_time - self.spawn_time < SPAWN_INTERVAL:
+            return
+        self.spawn_time = current_time
+
+        positions = self.world.roster.positions()
+        if len(positions) >= SPAWN_TOTAL_CAP:
+            return
+        population = Counter(self.world.chunk_at(pos) for pos in positions)
+        hitboxes = self.world.roster.hitboxes()
+        player_pos = pygame.math.Vector2(player_pos)
+        options = [(monster_name, pos) for key in self.world.loaded if population[key] < SPAWN_AREA_CAP
+                   for monster_name, pos in self.points.get(key, ())
+                   if player_pos.distance_to(pos) >= SPAWN_MIN_DISTANCE and not view_rect.collidepoint(pos)
+                   and pygame.Rect(pos, (TILESIZE, TILESIZE)).collidelist(hitboxes) == -1]
+        if options:
+            monster_name, pos = choice(options)
+            self.world.roster.spawn(monster_name, pos, monster_data[monster_name]['health'])
@@ -1,28 +1,29 @@
 import pygame
 from settings import *
-from support import import_folder, get_path
+from support import import_folder
+from audio import audio
 from entity import Entity
 from random import choice, uniform
 
 
 class Enemy(Entity):
+    attack_cooldown = 400
+    invisibility_duration = 300
+
     def __init__(self, monster_name, pos, groups, obstacle_sprites,
-                 damage_player, trigger_death_particles, add_exp, create_stick_projectile):
+                 damage_player, trigger_death_particles, add_exp, create_stick_projectile, flow_field=None):
         super().__init__(groups, pos)
         self.sprite_type = 'enemy'
 
+        self.monster_name = monster_name
         self.import_graphics(monster_name)
-        self.status = 'idle'
-        self.image = self.animations[self.status][self.frame_index]
-        self.rect = self.image.get_rect(topleft=pos)
-        self.hitbox = self.rect.inflate(0, -10)
         self.obstacle_sprites = obstacle_sprites
-        self.pos = pygame.math.Vector2(self.rect.center)
+        self.pos = pygame.math.Vector2()
+        self.flow_field = flow_field
+        self.player_direction = pygame.math.Vector2()
 
         # stats
-        self.monster_name = monster_name
         monster_info = monster_data[self.monster_name]
-        self.health = monster_info['health']
         self.exp = monster_info['exp']
         self.speed = monster_info['speed']
         self.attack_damage = monster_info['damage']
@@ -32,36 +33,60 @@ class Enemy(Entity):
         self.attack_type = monster_info['attack_type']
 
         # player interaction
-        self.can_attack = True
-        self.attack_time = None
-        self.attack_cooldown = 400
         self.damage_player = damage_player
         self.trigger_death_particles = trigger_death_particles
         self.add_exp = add_exp
 
-        # invisibility timer
-        self.vulnerable = True
-        self.hit_time = None
-        self.invisibility_duration = 300
-
         # sounds
-        self.hit_sound = pygame.mixer.Sound(get_path('../audio/hit.wav'))
-        self.death_sound = pygame.mixer.Sound(get_path('../audio/death.wav'))
-        self.attack_sound = pygame.mixer.Sound(monster_data[self.monster_name]['attack_sound'])
-        self.hit_sound.set_volume(0.6)
-        self.death_sound.set_volume(0.6)
-        self.attack_sound.set_volume(0.3)
+        self.attack_sound = monster_info['attack_sound']
 
         # stick projectile
         self.create_stick_projectile = create_stick_projectile
-        self.stick_timer = pygame.time.get_ticks()
         self.stick_interval = 2000  # 2초마다
 
+        self.reset(pos)
+        self.refresh_index()
+
+    def reset(self, pos):
+        # everything a fight changes; pooled enemies are reset instead of
+        # built again
+        self.status = 'idle'
+        self.frame_index = 0
+        self.image = self.get_animation(self.status)[self.frame_index]
+        self.rect = self.image.get_rect(topleft=pos)
+        self.hitbox = self.rect.inflate(0, -10)
+        self.pos.update(self.rect.center)
+        self.direction.update(0, 0)
+        self.health = monster_data[self.monster_name]['health']
+
+        # player interaction
+        self.can_attack = True
+        self.attack_time = None
+
+        # invisibility timer
+        self.vulnerable = True
+        self.hit_time = None
+
+        self.stick_timer = pygame.time.get_ticks()
+
+        # activity level, picked by the level from the distance to the player
+        self.activity = 'active'
+        self.ticking = True
+        self.skipped_dt = 0
+
     def import_graphics(self, name):
         self.animations = {'idle': [], 'move': [], 'attack': []}
+        if LOW_MEMORY_MODE:
+            return  # frames are looked up on use, see get_animation
         for animation in self.animations.keys():
             self.animations[animation] = import_folder(f'../graphics/monsters/{name}/' + animation)
 
+    def get_animation(self, status):
+        if LOW_MEMORY_MODE:
+            # not kept on the enemy, so the frame cache is free to evict the set
+            return import_folder(f'../graphics/monsters/{self.monster_name}/{status}')
+        return self.animations[status]
+
     def get_player_distance_direction(self, player):
         enemy_vec = pygame.math.Vector2(self.rect.center)
         player_vec = pygame.math.Vector2(player.rect.center)
@@ -69,41 +94,50 @@ class Enemy(Entity):
         direction = (player_vec - enemy_vec).normalize() if distance > 0 else pygame.math.Vector2()
         return (distance, direction)
 
-    def get_status(self, player):
-        distance = self.get_player_distance_direction(player)[0]
-        if distance <= self.attack_radius and self.can_attack:
-            if self.status != 'attack':
-                self.frame_index = 0
-            self.status = 'attack'
+    def get_move_direction(self):
+        # walk the shared flow field around obstacles; in a tile under the
+        # player or off the field, head straight for them
+        waypoint = self.flow_field.next_waypoint(self.rect.center) if self.flow_field else None
+        if waypoint is not None:
+            direction = waypoint - pygame.math.Vector2(self.rect.center)
+            if direction.length_squared() > 0:
+                return direction.normalize()
+        return self.player_direction.copy()
+
+    def get_status(self, distance, in_sight=True):
+        if not in_sight:
+            self.set_status('idle')
+        elif distance <= self.attack_radius and self.can_attack:
+            self.set_status('attack')
         elif distance <= self.notice_radius:
-            self.status = 'move'
+            self.set_status('move')
         else:
-            self.status = 'idle'
+            self.set_status('idle')
 
-    def actions(self, player):
+    def set_status(self, status):
+        if status == 'attack' and self.status != 'attack':
+            self.frame_index = 0
+        self.status = status
+
+    def actions(self):
         if self.status == 'attack':
             self.attack_time = pygame.time.get_ticks()
             self.damage_player(self.attack_damage, self.attack_type)
-            self.attack_sound.play()
+            audio.play(self.attack_sound, 0.3, self.rect.center)
         elif self.status == 'move':
-            self.direction = self.get_player_distance_direction(player)[1]
+            self.direction = self.get_move_direction()
         else:
             self.direction = pygame.math.Vector2()
 
     def animate(self, dt):
-        animation = self.animations[self.status]
+        animation = self.get_animation(self.status)
         self.frame_index += self.animation_speed * dt
         if self.frame_index >= len(animation):
             if self.status == 'attack':
                 self.can_attack = False
             self.frame_index = 0
 
-        self.image = animation[int(self.frame_index)]
-
-        if not self.vulnerable:
-            self.image.set_alpha(self.wave_value())
-        else:
-            self.image.set_alpha(255)
+        self.image = self.flicker(animation[int(self.frame_index)])
 
     def cooldown(self):
         current_time = pygame.time.get_ticks()
@@ -114,7 +148,7 @@ class Enemy(Entity):
 
     def get_damage(self, player, attack_type):
         if self.vulnerable:
-            self.hit_sound.play()
+            audio.play(hit_sound_path, 0.6, self.rect.center)
             self.direction = self.get_player_distance_direction(player)[1]
             if attack_type == 'weapon':
                 self.health -= player.get_full_weapon_damage()
@@ -128,7 +162,7 @@ class Enemy(Entity):
             self.kill()
             self.trigger_death_particles(self.rect.center, self.monster_name)
             self.add_exp(self.exp)
-            self.death_sound.play()
+            audio.play(death_sound_path, 0.6, self.rect.center)
 
     def hit_reaction(self):
         if not self.vulnerable:
@@ -144,13 +178,21 @@ class Enemy(Entity):
                 self.create_stick_projectile(self.rect.center, direction)
 
     def update(self, dt):
+        if self.activity != 'active':
+            # dormant enemies catch up in one larger step every DORMANT_TICK
+            # seconds, sleeping ones stand still until woken
+            self.skipped_dt = self.skipped_dt + dt if self.activity == 'dormant' else 0
+            self.ticking = self.skipped_dt >= DORMANT_TICK
+            if not self.ticking:
+                return
+            dt, self.skipped_dt = self.skipped_dt, 0
+        else:
+            self.ticking = True
+
         self.hit_reaction()
         self.move(self.speed, self.pos, dt)
+        self.refresh_index()
         self.animate(dt)
         self.cooldown()
         self.check_death()
-        self.shoot_stick()
-
-    def enemy_update(self, player):
-        self.get_status(player)
-        self.actions(player)
\ No newline at end of file
+        self.shoot_stick()
\ No newline at end of file
@@ -1,12 +1,14 @@
 import pygame
 from math import sin
+from support import assets
 
 
 class Entity(pygame.sprite.Sprite):
+    animation_speed = 4
+
     def __init__(self, groups, pos):
         super().__init__(groups)
         self.frame_index = 0
-        self.animation_speed = 4
         self.direction = pygame.math.Vector2()
 
     def move(self, speed, pos, dt):
@@ -27,28 +29,41 @@ class Entity(pygame.sprite.Sprite):
         self.rect.centery = self.hitbox.centery
         self.collision('vertical')
 
+    def refresh_index(self):
+        # indexed groups only re-bucket the sprite when it crossed a cell
+        for group in self.groups():
+            if hasattr(group, 'refresh'):
+                group.refresh(self)
+
     def collision(self, direction):
-        for sprite in self.obstacle_sprites.sprites():
-            if hasattr(sprite, 'hitbox'):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if direction == 'horizontal':
-                        if self.direction.x > 0:  # moving right
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0:  # moving left
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-
-                    if direction == 'vertical':
-                        if self.direction.y < 0:  # moving up
-                            self.hitbox.top = sprite.hitbox.bottom
-                        if self.direction.y > 0:  # moving down
-                            self.hitbox.bottom = sprite.hitbox.top
-                        self.rect.centery = self.hitbox.centery
-                        self.pos.y = self.hitbox.centery
+        # only the obstacles in the tiles under the hitbox can collide
+        for hitbox in self.obstacle_sprites.hitboxes_near(self.hitbox):
+            if hitbox.colliderect(self.hitbox):
+                if direction == 'horizontal':
+                    if self.direction.x > 0:  # moving right
+                        self.hitbox.right = hitbox.left
+                    if self.direction.x < 0:  # moving left
+                        self.hitbox.left = hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+
+                if direction == 'vertical':
+                    if self.direction.y < 0:  # moving up
+                        self.hitbox.top = hitbox.bottom
+                    if self.direction.y > 0:  # moving down
+                        self.hitbox.bottom = hitbox.top
+                    self.rect.centery = self.hitbox.centery
+                    self.pos.y = self.hitbox.centery
 
     def wave_value(self):
         value = sin(pygame.time.get_ticks())
         if value >= 0:
             return 255
         return 0
+
+    def flicker(self, frame):
+        # frames are shared between entities, so blink by swapping in a blank
+        # surface instead of changing the alpha of the frame itself
+        if not self.vulnerable and not self.wave_value():
+            return assets.blank(frame.get_size())
+        return frame
@@ -0,0 +1,232 @@
+import pygame
+from settings import *
+from support import import_folder
+from enemy import Enemy
+from perception import STATUSES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+IDLE, MOVE, ATTACK = range(len(STATUSES))
+
+
+class MonsterTable:
+    # per-type constants, one row per monster type, indexed by type code
+    def __init__(self):
+        self.names = list(monster_data)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        info = [monster_data[name] for name in self.names]
+        self.speed = numpy.array([monster['speed'] for monster in info], dtype=float)
+        self.notice_radius = numpy.array([monster['notice_radius'] for monster in info], dtype=float)
+        self.health = numpy.array([monster['health'] for monster in info], dtype=float)
+
+        frames = [{status: import_folder(f'../graphics/monsters/{name}/{status}') for status in STATUSES} for name in self.names]
+        self.frame_counts = numpy.array([[len(monster[status]) for status in STATUSES] for monster in frames])
+        # the sprite is built at its topleft from the first idle frame
+        self.half_width = numpy.array([monster['idle'][0].get_width() / 2 for monster in frames])
+        self.half_height = numpy.array([monster['idle'][0].get_height() / 2 for monster in frames])
+
+
+class EnemyStore:
+    # enemies as rows of typed arrays; only the ones the player is about to
+    # meet or can see become Enemy sprites, everything else moves, animates
+    # and cools down in bulk. A freed row goes back on the free list
+    supported = numpy is not None
+
+    def __init__(self, level_data, pool, capacity=64):
+        self.level_data = level_data
+        self.pool = pool
+        self.table = MonsterTable()
+        self.blocked = numpy.frombuffer(level_data.blocked, dtype=numpy.uint8)
+        self.count = 0
+        self.free = []
+        self.sprites = []
+        self.slots = {}
+        self.activity_time = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        old = getattr(self, 'alive', None)
+        fields = {
+            'x': float, 'y': float, 'dir_x': float, 'dir_y': float, 'health': float, 'frame': float,
+            'kind': numpy.int16, 'status': numpy.int8,
+            'attack_time': numpy.int64, 'hit_time': numpy.int64, 'stick_time': numpy.int64,
+            'can_attack': bool, 'vulnerable': bool, 'alive': bool, 'shown': bool,
+        }
+        for name, dtype in fields.items():
+            array = numpy.zeros(capacity, dtype=dtype)
+            if old is not None:
+                array[:len(old)] = getattr(self, name)
+            setattr(self, name, array)
+
+    def spawn(self, monster_name, pos, health):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.count == len(self.alive):
+                self.allocate(self.count * 2)
+            slot = self.count
+            self.count += 1
+        kind = self.table.codes[monster_name]
+        self.kind[slot] = kind
+        self.x[slot] = pos[0] + self.table.half_width[kind]
+        self.y[slot] = pos[1] + self.table.half_height[kind]
+        self.dir_x[slot] = self.dir_y[slot] = 0
+        self.health[slot] = health
+        self.frame[slot] = 0
+        self.status[slot] = IDLE
+        self.attack_time[slot] = self.hit_time[slot] = 0
+        self.stick_time[slot] = pygame.time.get_ticks()
+        self.can_attack[slot] = self.vulnerable[slot] = True
+        self.alive[slot] = True
+        self.shown[slot] = False
+
+    def topleft(self, slot):
+        kind = self.kind[slot]
+        return int(self.x[slot] - self.table.half_width[kind]), int(self.y[slot] - self.table.half_height[kind])
+
+    def positions(self):
+        positions = [enemy.rect.topleft for enemy in self.sprites if enemy.alive()]
+        for slot in numpy.flatnonzero(self.alive[:self.count] & ~self.shown[:self.count]).tolist():
+            positions.append(self.topleft(slot))
+        return positions
+
+    def hitboxes(self):
+        # parked rows get the box their sprite would have, the frame trimmed
+        # by the same 10 pixels as Enemy.hitbox
+        hitboxes = [enemy.hitbox for enemy in self.sprites if enemy.alive()]
+        for slot in numpy.flatnonzero(self.alive[:self.count] & ~self.shown[:self.count]).tolist():
+            kind = self.kind[slot]
+            hitbox = pygame.Rect(0, 0, int(self.table.half_width[kind] * 2), int(self.table.half_height[kind] * 2) - 10)
+            hitbox.center = int(self.x[slot]), int(self.y[slot])
+            hitboxes.append(hitbox)
+        return hitboxes
+
+    def release(self, slot):
+        self.alive[slot] = False
+        self.shown[slot] = False
+        self.free.append(slot)
+
+    def show(self, slot):
+        enemy = self.pool.acquire(self.table.names[self.kind[slot]], self.topleft(slot))
+        enemy.health = float(self.health[slot])
+        enemy.pos.update(self.x[slot], self.y[slot])
+        enemy.hitbox.center = round(enemy.pos.x), round(enemy.pos.y)
+        enemy.rect.center = enemy.hitbox.center
+        enemy.refresh_index()
+        enemy.direction.update(self.dir_x[slot], self.dir_y[slot])
+        enemy.status = STATUSES[self.status[slot]]
+        enemy.frame_index = float(self.frame[slot])
+        enemy.can_attack = bool(self.can_attack[slot])
+        enemy.attack_time = int(self.attack_time[slot])
+        enemy.vulnerable = bool(self.vulnerable[slot])
+        enemy.hit_time = int(self.hit_time[slot])
+        enemy.stick_timer = int(self.stick_time[slot])
+        self.shown[slot] = True
+        self.sprites.append(enemy)
+        self.slots[enemy] = slot
+
+    def hide(self, enemy):
+        slot = self.slots.pop(enemy)
+        self.sprites.remove(enemy)
+        self.x[slot], self.y[slot] = enemy.pos
+        self.dir_x[slot], self.dir_y[slot] = enemy.direction
+        self.health[slot] = enemy.health
+        self.status[slot] = STATUSES.index(enemy.status)
+        self.frame[slot] = enemy.frame_index
+        self.can_attack[slot] = enemy.can_attack
+        self.attack_time[slot] = enemy.attack_time or 0
+        self.vulnerable[slot] = enemy.vulnerable
+        self.hit_time[slot] = enemy.hit_time or 0
+        self.stick_time[slot] = enemy.stick_timer
+        self.shown[slot] = False
+        self.pool.release(enemy)
+
+    def reap(self):
+        # sprites that died in combat give their row back
+        for enemy in [enemy for enemy in self.sprites if not enemy.alive()]:
+            self.sprites.remove(enemy)
+            self.release(self.slots.pop(enemy))
+            self.pool.release(enemy)
+
+    def collect(self, keep):
+        self.reap()
+        for enemy in [enemy for enemy in self.sprites if not keep(enemy.rect.topleft)]:
+            self.hide(enemy)
+        parked = []
+        for slot in numpy.flatnonzero(self.alive[:self.count] & ~self.shown[:self.count]).tolist():
+            pos = self.topleft(slot)
+            if not keep(pos):
+                parked.append((self.table.names[self.kind[slot]], pos, float(self.health[slot])))
+                self.release(slot)
+        return parked
+
+    def cells_blocked(self, x, y):
+        width, height = self.level_data.width, self.level_data.height
+        col = numpy.floor_divide(x, TILESIZE).astype(int)
+        row = numpy.floor_divide(y, TILESIZE).astype(int)
+        inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+        index = numpy.where(inside, row * width + col, 0)
+        return ~inside | (self.blocked[index] != 0)
+
+    def step(self, rows, dt, player_pos):
+        # one pass over every stored enemy: pick a status, move with grid
+        # collision, advance the animation and the cooldown timers
+        table = self.table
+        kind = self.kind[rows]
+        offset_x = player_pos[0] - self.x[rows]
+        offset_y = player_pos[1] - self.y[rows]
+        distance = numpy.hypot(offset_x, offset_y)
+        awake = distance <= DORMANT_RADIUS
+
+        moving = distance <= table.notice_radius[kind]
+        status = numpy.where(moving, MOVE, IDLE)
+        scale = numpy.where(moving & (distance > 0), 1 / numpy.where(distance > 0, distance, 1), 0)
+        self.dir_x[rows] = offset_x * scale
+        self.dir_y[rows] = offset_y * scale
+
+        step = table.speed[kind] * dt * awake
+        x = self.x[rows] + self.dir_x[rows] * step
+        x = numpy.where(self.cells_blocked(x, self.y[rows]), self.x[rows], x)
+        y = self.y[rows] + self.dir_y[rows] * step
+        y = numpy.where(self.cells_blocked(x, y), self.y[rows], y)
+        self.x[rows] = x
+        self.y[rows] = y
+
+        frame = numpy.where(status == self.status[rows], self.frame[rows], 0) + Enemy.animation_speed * dt * awake
+        self.frame[rows] = numpy.mod(frame, table.frame_counts[kind, status])
+        self.status[rows] = status
+
+        current_time = pygame.time.get_ticks()
+        self.can_attack[rows] |= current_time - self.attack_time[rows] >= Enemy.attack_cooldown
+        self.vulnerable[rows] |= current_time - self.hit_time[rows] >= Enemy.invisibility_duration
+
+    def update(self, dt, player_pos, view_rect):
+        self.reap()
+        alive = self.alive[:self.count]
+        rows = numpy.flatnonzero(alive & ~self.shown[:self.count])
+        if len(rows):
+            self.step(rows, dt, player_pos)
+
+        current_time = pygame.time.get_ticks()
+        if current_time - self.activity_time < ACTIVITY_INTERVAL:
+            return
+        self.activity_time = current_time
+
+        # sprites only for the enemies within reach or on screen
+        player_pos = pygame.math.Vector2(player_pos)
+        for enemy in [enemy for enemy in self.sprites
+                      if player_pos.distance_to(enemy.rect.center) > enemy.notice_radius + ACTIVE_MARGIN
+                      and not view_rect.colliderect(enemy.rect)]:
+            self.hide(enemy)
+
+        rows = numpy.flatnonzero(alive & ~self.shown[:self.count])
+        kind = self.kind[rows]
+        x, y = self.x[rows], self.y[rows]
+        near = numpy.hypot(player_pos.x - x, player_pos.y - y) <= self.table.notice_radius[kind] + ACTIVE_MARGIN
+        on_screen = ((numpy.abs(x - view_rect.centerx) < view_rect.width / 2 + self.table.half_width[kind])
+                     & (numpy.abs(y - view_rect.centery) < view_rect.height / 2 + self.table.half_height[kind]))
+        for slot in rows[near | on_screen].tolist():
+            self.show(slot)
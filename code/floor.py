@@ -0,0 +1,94 @@
+import os
+import pygame
+import xml.etree.ElementTree as ElementTree
+from settings import *
+from support import get_path, load_image
+
+tilesets = {}
+
+
+class Tileset:
+    def __init__(self, path):
+        root = ElementTree.parse(path).getroot()
+        self.tile_width = int(root.get('tilewidth'))
+        self.tile_height = int(root.get('tileheight'))
+        self.columns = int(root.get('columns'))
+        image = root.find('image')
+        self.sheet = load_image(resolve_image(path, image.get('source')))
+        self.tiles = {}
+
+    def get_tile(self, tile_id):
+        tile = self.tiles.get(tile_id)
+        if tile is None:
+            x = (tile_id % self.columns) * self.tile_width
+            y = (tile_id // self.columns) * self.tile_height
+            tile = self.sheet.subsurface((x, y, self.tile_width, self.tile_height))
+            self.tiles[tile_id] = tile
+        return tile
+
+
+def resolve_image(tsx_path, source):
+    path = os.path.normpath(os.path.join(os.path.dirname(tsx_path), source))
+    if os.path.exists(path):
+        return path
+    # the tilesets were authored next to the graphics folder; fall back to
+    # the game's own graphics root when the relative path does not resolve
+    if 'graphics/' in source:
+        return get_path('../graphics/' + source.split('graphics/', 1)[1])
+    return path
+
+
+def load_tileset(path):
+    path = os.path.normpath(get_path(path))
+    if path not in tilesets:
+        tilesets[path] = Tileset(path)
+    return tilesets[path]
+
+
+class FloorRenderer:
+    # renders the floor layers in square chunks around the camera and keeps
+    # only the chunks near it cached, so the cost follows the screen size
+    def __init__(self, level_data, chunk_tiles=FLOOR_CHUNK_TILES):
+        self.layers = [(level_data.layers[name], load_tileset(tsx_path)) for name, tsx_path in level_data.floor]
+        self.rows = level_data.height
+        self.cols = level_data.width
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles * TILESIZE
+        self.chunks = {}
+
+    def render_chunk(self, chunk_col, chunk_row):
+        surf = pygame.Surface((self.chunk_size, self.chunk_size)).convert()
+        surf.fill(WATER_COLOR)
+        first_col = chunk_col * self.chunk_tiles
+        first_row = chunk_row * self.chunk_tiles
+        for layer, tileset in self.layers:
+            for row_idx in range(first_row, min(first_row + self.chunk_tiles, self.rows)):
+                start = row_idx * self.cols
+                y = (row_idx - first_row) * TILESIZE
+                for col_idx in range(first_col, min(first_col + self.chunk_tiles, self.cols)):
+                    tile_id = layer[start + col_idx]
+                    if tile_id != -1:
+                        surf.blit(tileset.get_tile(tile_id), ((col_idx - first_col) * TILESIZE, y))
+        return surf
+
+    def draw(self, surface, view_rect):
+        size = self.chunk_size
+        first_col = max(view_rect.left // size, 0)
+        last_col = min((view_rect.right - 1) // size, (self.cols - 1) // self.chunk_tiles)
+        first_row = max(view_rect.top // size, 0)
+        last_row = min((view_rect.bottom - 1) // size, (self.rows - 1) // self.chunk_tiles)
+
+        blits = []
+        for chunk_row in range(first_row, last_row + 1):
+            for chunk_col in range(first_col, last_col + 1):
+                chunk = self.chunks.get((chunk_col, chunk_row))
+                if chunk is None:
+                    chunk = self.render_chunk(chunk_col, chunk_row)
+                    self.chunks[(chunk_col, chunk_row)] = chunk
+                blits.append((chunk, (chunk_col * size - view_rect.left, chunk_row * size - view_rect.top)))
+        surface.blits(blits, False)
+
+        # drop chunks that are more than one chunk away from the screen
+        for key in [key for key in self.chunks
+                    if not (first_col - 1 <= key[0] <= last_col + 1 and first_row - 1 <= key[1] <= last_row + 1)]:
+            del self.chunks[key]
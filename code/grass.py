@@ -0,0 +1,74 @@
+from array import array
+from random import randrange
+from settings import *
+from level_data import BLOCK_GRASS
+
+
+class GrassField:
+    # grass as grid data: a variant index and one alive bit per cell; it is
+    # drawn, collided with and attacked through cell lookups, never as sprites
+    def __init__(self, level_data, images):
+        self.level_data = level_data
+        self.width = level_data.width
+        self.height = level_data.height
+        self.images = images
+        self.variants = array('b', [-1]) * (self.width * self.height)
+        self.alive = bytearray((self.width * self.height + 7) // 8)
+
+        # image rect and hitbox of every variant, relative to its cell
+        self.rects = [image.get_rect() for image in images]
+        self.hitboxes = [rect.inflate(-10, HITBOX_OFFSET['grass']) for rect in self.rects]
+        self.reach_x = max(rect.right for rect in self.rects)
+        self.reach_y = max(rect.bottom for rect in self.rects)
+
+        for col, row, _ in level_data.cells('grass'):
+            index = row * self.width + col
+            self.variants[index] = randrange(len(images))
+            self.alive[index >> 3] |= 1 << (index & 7)
+
+    def is_alive(self, col, row):
+        if 0 <= col < self.width and 0 <= row < self.height:
+            index = row * self.width + col
+            return self.alive[index >> 3] >> (index & 7) & 1
+        return 0
+
+    def cells_near(self, rect):
+        # standing grass whose image may reach into rect, in row order
+        first_col = max((rect.left - self.reach_x) // TILESIZE + 1, 0)
+        last_col = min((rect.right - 1) // TILESIZE, self.width - 1)
+        first_row = max((rect.top - self.reach_y) // TILESIZE + 1, 0)
+        last_row = min((rect.bottom - 1) // TILESIZE, self.height - 1)
+        alive = self.alive
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                index = row * self.width + col
+                if alive[index >> 3] >> (index & 7) & 1:
+                    yield col, row, self.variants[index]
+
+    def hitboxes_near(self, rect):
+        for col, row, variant in self.cells_near(rect):
+            yield self.hitboxes[variant].move(col * TILESIZE, row * TILESIZE)
+
+    def cells_hit(self, rect):
+        return [(col, row) for col, row, variant in self.cells_near(rect)
+                if self.rects[variant].move(col * TILESIZE, row * TILESIZE).colliderect(rect)]
+
+    def cell_rect(self, col, row):
+        return self.rects[self.variants[row * self.width + col]].move(col * TILESIZE, row * TILESIZE)
+
+    def cell_image(self, col, row):
+        return self.images[self.variants[row * self.width + col]]
+
+    def cut(self, col, row):
+        index = row * self.width + col
+        self.alive[index >> 3] &= ~(1 << (index & 7))
+        self.level_data.blocked[index] &= ~BLOCK_GRASS
+
+    def query(self, view_rect):
+        # (centery, image, topleft) of the grass in view, in draw order
+        visible = []
+        for col, row, variant in self.cells_near(view_rect):
+            x, y = col * TILESIZE, row * TILESIZE
+            visible.append((y + self.rects[variant].centery, self.images[variant], (x, y)))
+        visible.sort(key=lambda item: item[0])
+        return visible
@@ -1,32 +1,62 @@
 import pygame
 from settings import *
 from tile import Tile
+from grass import GrassField
+from floor import FloorRenderer
 from player import Player
-from support import get_path, import_csv_layout, import_folder
-from random import choice, randint
+from support import import_folder, load_image, masks_overlap, assets
+from level_data import load_level
+from debug import debug
+from random import randint
+from heapq import merge
+from operator import itemgetter
 from weapon import Weapon
 from ui import UI
 from enemy import Enemy
-from particles import AnimationPlayer
+from particles import AnimationPlayer, ParticleEngine
 from magic import MagicPlayer
 from upgrade import Upgrade
-from stick import StickProjectile
+from projectiles import ProjectileSystem
+from audio import audio
+from asset_pack import load_pack
+from spatial import SpatialGroup, YSortedGrid, centery
+from streaming import WorldStreamer, EnemyRoster
+from entity_store import EnemyStore
+from pathfinding import FlowField
+from perception import Perception
+from crowd import separate
+from sight import LineOfSight
+from pool import EnemyPool
+from director import SpawnDirector
 
 class Level:
-    def __init__(self):
+    def __init__(self, name='level_0'):
         # general setup
+        self.name = name
         self.display_surface = pygame.display.get_surface()
         self.game_paused = False
 
+        load_pack()
+        if LOW_MEMORY_MODE:
+            assets.set_budget(FRAME_CACHE_BUDGET, FRAME_CACHE_ROOTS)
+        if MASK_HIT_MODE:
+            assets.use_masks()
+            for weapon in weapon_data:
+                for direction in ('up', 'down', 'left', 'right'):
+                    load_image(f'../graphics/weapons/{weapon}/{direction}.png')
+        self.frame_cache_time = 0
+
         # sprite group setup
         self.visible_sprites = YSortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        # obstacles are indexed by tile as create_map adds them and drop out
+        # of the index on kill, so collision checks stay local
+        self.obstacle_sprites = SpatialGroup(rect_attr='hitbox')
 
         # attack sprites
         self.current_attack = None
         self.attack_sprites = pygame.sprite.Group()
-        self.attackable_sprites = pygame.sprite.Group()
-        self.stick_sprites = pygame.sprite.Group()
+        # grass and enemies by tile, so an attack only tests what is around it
+        self.attackable_sprites = SpatialGroup()
 
         # sprite setup
         self.create_map()
@@ -36,76 +66,75 @@ class Level:
         self.upgrade = Upgrade(self.player)
 
         # particles
-        self.animation_player = AnimationPlayer()
+        self.particles = ParticleEngine()
+        self.animation_player = AnimationPlayer(self.particles)
         self.magic_player = MagicPlayer(self.animation_player)
 
     def create_map(self):
-        layouts = {
-            'boundary': import_csv_layout('../data/map/map_FloorBlocks.csv'),
-            'grass': import_csv_layout('../data/map/map_Grass.csv'),
-            'object': import_csv_layout('../data/map/map_Objects.csv'),
-            'entities': import_csv_layout('../data/map/map_Entities.csv'),
-        }
+        self.level_data = load_level(self.name)
+        self.visible_sprites.floor = FloorRenderer(self.level_data)
 
-        graphics = {
+        self.graphics = {
             'grass': import_folder('../graphics/grass'),
             'objects': import_folder('../graphics/objects'),
         }
 
-        for style, layout in layouts.items():
-            for row_idx, row in enumerate(layout):
-                for col_idx, col in enumerate(row):
-                    if col != '-1':
-                        x = col_idx * TILESIZE
-                        y = row_idx * TILESIZE
-
-                        if style == 'boundary':
-                            Tile((x, y), [self.obstacle_sprites], 'invisible')
-
-                        if style == 'grass':
-                            random_grass_image = choice(graphics['grass'])
-                            Tile((x, y), [self.visible_sprites, self.obstacle_sprites, self.attackable_sprites], 'grass', random_grass_image)
-
-                        if style == 'object':
-                            surf = graphics['objects'][int(col)]
-                            Tile((x, y), [self.visible_sprites, self.obstacle_sprites], 'object', surf)
-
-                        if style == 'entities':
-                            if col == '394':
-                                self.player = Player(
-                                    (x, y),
-                                    [self.visible_sprites],
-                                    self.obstacle_sprites,
-                                    self.create_attack,
-                                    self.destroy_attack,
-                                    self.create_magic)
-                            else:
-                                if col == '390':
-                                    monster_name = 'bamboo'
-                                elif col == '391':
-                                    monster_name = 'spirit'
-                                elif col == '392':
-                                    monster_name = 'raccoon'
-                                else:
-                                    monster_name = 'squid'
-
-                                Enemy(
-                                    monster_name,
-                                    (x, y),
-                                    [self.visible_sprites, self.attackable_sprites],
-                                    self.obstacle_sprites,
-                                    self.damage_player,
-                                    self.trigger_death_particles,
-                                    self.add_exp,
-                                    self.create_stick_projectile  # 추가된 부분
-                                )
+        for entity_id, col, row in self.level_data.spawns:
+            if entity_id == PLAYER_ID:
+                self.player = Player(
+                    (col * TILESIZE, row * TILESIZE),
+                    [self.visible_sprites],
+                    self.obstacle_sprites,
+                    self.create_attack,
+                    self.destroy_attack,
+                    self.create_magic)
+
+        # grass is grid data; obstacles and the camera look it up by cell
+        self.grass = GrassField(self.level_data, self.graphics['grass'])
+        self.obstacle_sprites.layers.append(self.grass)
+        self.visible_sprites.layers.append(self.grass)
+
+        self.sight = LineOfSight(self.level_data)
+        self.perception = Perception(self.sight)
+        self.projectiles = ProjectileSystem(self.level_data, self.damage_player)
+        self.flow_field = FlowField(self.level_data)
+        self.flow_field.update(self.player.hitbox)
+
+        # tiles and enemies only exist in the chunks around the player
+        self.enemy_pool = EnemyPool(self.create_enemy, [self.visible_sprites, self.attackable_sprites])
+        self.enemy_pool.prewarm()
+        if ENEMY_STORE_MODE and EnemyStore.supported:
+            roster = EnemyStore(self.level_data, self.enemy_pool)
+        else:
+            roster = EnemyRoster(self.enemy_pool)
+        self.world = WorldStreamer(self.level_data, self.create_tile, roster)
+        self.world.update(self.player.rect.center)
+        self.spawn_director = SpawnDirector(self.world, self.level_data)
+
+    def create_tile(self, sprite_type, pos, index=0):
+        if sprite_type == 'invisible':
+            return Tile(pos, [self.obstacle_sprites], 'invisible')
+        return Tile(pos, [self.visible_sprites, self.obstacle_sprites], 'object', self.graphics['objects'][index])
+
+    def create_enemy(self, monster_name, pos):
+        return Enemy(
+            monster_name,
+            pos,
+            [self.visible_sprites, self.attackable_sprites],
+            self.obstacle_sprites,
+            self.damage_player,
+            self.trigger_death_particles,
+            self.add_exp,
+            self.create_stick_projectile,  # 추가된 부분
+            self.flow_field
+        )
 
     def create_attack(self):
         self.current_attack = Weapon(self.player, [self.visible_sprites, self.attack_sprites])
 
     def create_magic(self, style, strength, cost):
         if style == 'heal':
-            self.magic_player.heal(self.player, strength, cost, [self.visible_sprites])
+            self.magic_player.heal(self.player, strength, cost)
         if style == 'flame':
             self.magic_player.flame(self.player, cost, [self.visible_sprites, self.attack_sprites])
 
@@ -115,75 +144,171 @@ class Level:
         self.current_attack = None
 
     def create_stick_projectile(self, pos, direction):
-        StickProjectile(pos, direction, [self.visible_sprites, self.stick_sprites], self.obstacle_sprites)
+        self.projectiles.fire('stick', pos, direction)
 
     def player_attack_logic(self):
         if self.attack_sprites:
             for attack_sprite in self.attack_sprites:
-                collision_sprites = pygame.sprite.spritecollide(attack_sprite, self.attackable_sprites, False)
-                if collision_sprites:
-                    for target_sprite in collision_sprites:
-                        if target_sprite.sprite_type == 'grass':
-                            pos = target_sprite.rect.center
-                            offset = pygame.math.Vector2(0, 75)
-                            for leaf in range(randint(3, 6)):
-                                self.animation_player.create_grass_particles(pos - offset, [self.visible_sprites])
-                            target_sprite.kill()
-                        else:
-                            target_sprite.get_damage(self.player, attack_sprite.sprite_type)
+                grass_hit = self.grass.cells_hit(attack_sprite.rect)
+                collision_sprites = [sprite for sprite in self.attackable_sprites.nearby(attack_sprite.rect)
+                                     if sprite.rect.colliderect(attack_sprite.rect)]
+                if MASK_HIT_MODE:
+                    # the rects only shortlist, the cached masks decide
+                    grass_hit = [(col, row) for col, row in grass_hit
+                                 if masks_overlap(attack_sprite.image, attack_sprite.rect.topleft,
+                                                  self.grass.cell_image(col, row), self.grass.cell_rect(col, row).topleft)]
+                    collision_sprites = [sprite for sprite in collision_sprites
+                                         if masks_overlap(attack_sprite.image, attack_sprite.rect.topleft,
+                                                          sprite.image, sprite.rect.topleft)]
+
+                for col, row in grass_hit:
+                    pos = self.grass.cell_rect(col, row).center
+                    offset = pygame.math.Vector2(0, 75)
+                    for leaf in range(randint(3, 6)):
+                        self.animation_player.create_grass_particles(pos - offset)
+                    self.grass.cut(col, row)
+                    self.flow_field.open_cell(col, row)
+                    self.sight.invalidate()
+
+                for target_sprite in collision_sprites:
+                    target_sprite.get_damage(self.player, attack_sprite.sprite_type)
 
     def damage_player(self, amount, attack_type):
         if self.player.vulnerable:
             self.player.health -= amount
             self.player.vulnerable = False
             self.player.hurt_time = pygame.time.get_ticks()
-            self.animation_player.create_particles(attack_type, self.player.rect.center, [self.visible_sprites])
+            self.animation_player.create_particles(attack_type, self.player.rect.center)
 
     def trigger_death_particles(self, pos, particle_type):
-        self.animation_player.create_particles(particle_type, pos, self.visible_sprites)
+        self.animation_player.create_particles(particle_type, pos)
 
     def add_exp(self, amount):
         self.player.exp += amount
 
+    def enemy_update(self):
+        enemies = [enemy for enemy in self.world.roster.sprites if enemy.ticking and enemy.alive()]
+        self.perception.update(enemies, self.player)
+        separate(enemies)
+
+    def update_frame_cache(self):
+        # keep the frame sets of monsters around the player at the young end
+        # of the cache so the sets of far away types get evicted first
+        current_time = pygame.time.get_ticks()
+        if current_time - self.frame_cache_time < FRAME_CACHE_INTERVAL:
+            return
+        self.frame_cache_time = current_time
+
+        player_pos = pygame.math.Vector2(self.player.rect.center)
+        near_types = {sprite.monster_name for sprite in self.attackable_sprites
+                      if sprite.sprite_type == 'enemy'
+                      and player_pos.distance_to(sprite.rect.center) <= FRAME_CACHE_RADIUS}
+        for monster_name in near_types:
+            for status in ('idle', 'move', 'attack'):
+                assets.touch(f'../graphics/monsters/{monster_name}/{status}')
+        assets.enforce_budget()
+
+    def show_memory(self):
+        usage = assets.memory_usage()
+        debug(' '.join(f'{name} {size / 1048576:.1f}MB' for name, size in usage.items()), y=self.display_surface.get_height() - 40)
+
     def toggle_menu(self):
         self.game_paused = not self.game_paused
 
     def run(self, dt):
+        audio.set_listener(self.player.rect.center)
+        self.world.update(self.player.rect.center)
         self.visible_sprites.custom_draw(self.player)
+        self.particles.draw(self.display_surface, self.visible_sprites.offset, self.visible_sprites.view_rect)
+        self.projectiles.draw(self.display_surface, self.visible_sprites.offset, self.visible_sprites.view_rect)
         self.ui.display(self.player)
 
         if self.game_paused:
             self.upgrade.display()
         else:
+            view_rect = self.display_surface.get_rect(center=self.player.rect.center).inflate(CULL_MARGIN * 2, CULL_MARGIN * 2)
+            self.world.roster.update(dt, self.player.rect.center, view_rect)
+            self.spawn_director.update(self.player.rect.center, view_rect)
             self.visible_sprites.update(dt)
-            self.visible_sprites.enemy_update(self.player)
-            self.stick_sprites.update(dt)  # 막대기 업데이트
+            self.flow_field.update(self.player.hitbox)
+            self.enemy_update()
+            self.projectiles.update(dt, self.player)
+            self.particles.update(dt)
             self.player_attack_logic()
+            if LOW_MEMORY_MODE:
+                self.update_frame_cache()
+
+        if SHOW_MEMORY:
+            self.show_memory()
 
 class YSortCameraGroup(pygame.sprite.Group):
     def __init__(self):
+        # tiles never move, so they are kept pre-sorted in a grid; the few
+        # moving sprites are re-sorted every frame from last frame's order
+        self.static_sprites = YSortedGrid(TILESIZE * 2)
+        self.moving_sprites = []
+        # grid layers that hand out (centery, image, topleft) in draw order
+        self.layers = []
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.half_width = self.display_surface.get_size()[0] // 2
         self.half_height = self.display_surface.get_size()[1] // 2
         self.offset = pygame.math.Vector2()
+        self.view_rect = self.display_surface.get_rect()
+        # set once the level data is loaded
+        self.floor = None
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        if isinstance(sprite, Tile):
+            self.static_sprites.insert(sprite)
+        else:
+            self.moving_sprites.append(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if isinstance(sprite, Tile):
+            self.static_sprites.remove(sprite)
+        else:
+            self.moving_sprites.remove(sprite)
+
+    def sort_moving_sprites(self):
+        # insertion sort: the order barely changes between frames, so this
+        # stays close to linear
+        moving = self.moving_sprites
+        for i in range(1, len(moving)):
+            sprite = moving[i]
+            y = sprite.rect.centery
+            j = i - 1
+            while j >= 0 and moving[j].rect.centery > y:
+                moving[j + 1] = moving[j]
+                j -= 1
+            moving[j + 1] = sprite
 
-        floor_path = get_path('../graphics/tilemap/ground.png')
-        self.floor_surf = pygame.image.load(floor_path).convert()
-        self.floor_rect = self.floor_surf.get_rect(topleft=(0, 0))
+    def get_visible_sprites(self, view_rect):
+        static = self.static_sprites.query(view_rect)
+        moving = [sprite for sprite in self.moving_sprites if sprite.rect.colliderect(view_rect)]
+        if YSORT_INCREMENTAL:
+            return list(merge(static, moving, key=centery))
+        return sorted(static + moving, key=centery)
 
     def custom_draw(self, player):
         self.offset.x = player.rect.centerx - self.half_width
         self.offset.y = player.rect.centery - self.half_height
+        offset_x, offset_y = int(self.offset.x), int(self.offset.y)
 
-        floor_offset_pos = self.floor_rect.topleft - self.offset
-        self.display_surface.blit(self.floor_surf, floor_offset_pos)
+        view_rect = self.display_surface.get_rect(topleft=(offset_x, offset_y))
+        if self.floor:
+            self.floor.draw(self.display_surface, view_rect)
 
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-            offset_rect = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_rect)
+        # only sprites around the camera get sorted and drawn
+        view_rect.inflate_ip(CULL_MARGIN * 2, CULL_MARGIN * 2)
+        self.view_rect = view_rect
+        if YSORT_INCREMENTAL:
+            self.sort_moving_sprites()
+        visible = [(sprite.rect.centery, sprite.image, sprite.rect.topleft) for sprite in self.get_visible_sprites(view_rect)]
+        if self.layers:
+            visible = merge(visible, *(layer.query(view_rect) for layer in self.layers), key=itemgetter(0))
 
-    def enemy_update(self, player):
-        enemy_sprites = [sprite for sprite in self.sprites() if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy']
-        for enemy in enemy_sprites:
-            enemy.enemy_update(player)
\ No newline at end of file
+        self.display_surface.blits(
+            [(image, (x - offset_x, y - offset_y)) for _, image, (x, y) in visible], False)
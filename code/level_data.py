@@ -0,0 +1,248 @@
+import os
+import sys
+import mmap
+import struct
+import pygame
+from array import array
+from settings import *
+from support import get_path, import_csv_layout, natural_key
+from tmx import TmxMap
+
+# package layout: header, layer names, int16 layers, uint8 collision grid,
+# the spawn and object lists as int16 (id, col, row) triples, then the floor
+# as (layer name, tileset path) pairs
+MAGIC = b'RPGLVL03'
+HEADER = struct.Struct('<8sHHHIIH')
+LAYER_NAME = struct.Struct('<16s')
+PLACEMENT = struct.Struct('<hhh')
+PATH_LENGTH = struct.Struct('<H')
+
+# collision grid bits
+BLOCK_BOUNDARY = 1
+BLOCK_OBJECT = 2
+BLOCK_GRASS = 4
+
+OBJECT_FOLDER = '../graphics/objects'
+object_sizes = []
+
+
+def get_object_sizes():
+    # image size of every object, numbered like import_folder numbers them;
+    # the headers are enough, so this works without a display
+    if not object_sizes:
+        folder = get_path(OBJECT_FOLDER)
+        names = sorted((name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name))),
+                       key=natural_key)
+        object_sizes.extend(pygame.image.load(os.path.join(folder, name)).get_size() for name in names)
+    return object_sizes
+
+
+def object_hitbox(object_id, col, row):
+    # the same hitbox Tile gives the object, drawn one row up
+    width, height = get_object_sizes()[object_id]
+    rect = pygame.Rect(col * TILESIZE, (row - 1) * TILESIZE, width, height)
+    return rect.inflate(-10, HITBOX_OFFSET['object'])
+
+
+class LevelData:
+    # the map as flat row-major int layers, -1 marking empty cells; the
+    # collision grid and placement lists are derived on first use unless the
+    # loader already has them. floor lists the (layer, tileset path) pairs
+    # drawn as the floor, bottom first
+    def __init__(self, width, height, layers, blocked=None, spawns=None, objects=None, floor=()):
+        self.width = width
+        self.height = height
+        self.layers = layers
+        self.floor = list(floor)
+        self._blocked = blocked
+        self._spawns = spawns
+        self._objects = objects
+
+    @property
+    def blocked(self):
+        if self._blocked is None:
+            self._blocked = bytearray(self.width * self.height)
+            for name, bit in (('boundary', BLOCK_BOUNDARY), ('grass', BLOCK_GRASS)):
+                if name in self.layers:
+                    for col, row, _ in self.cells(name):
+                        self._blocked[row * self.width + col] |= bit
+            # objects block every cell their hitbox reaches into
+            for object_id, col, row in self.objects:
+                hitbox = object_hitbox(object_id, col, row)
+                for cell_row in range(max(hitbox.top // TILESIZE, 0), min((hitbox.bottom - 1) // TILESIZE + 1, self.height)):
+                    for cell_col in range(max(hitbox.left // TILESIZE, 0), min((hitbox.right - 1) // TILESIZE + 1, self.width)):
+                        self._blocked[cell_row * self.width + cell_col] |= BLOCK_OBJECT
+        return self._blocked
+
+    @property
+    def spawns(self):
+        if self._spawns is None:
+            self._spawns = self.placements('entities')
+        return self._spawns
+
+    @property
+    def objects(self):
+        if self._objects is None:
+            self._objects = self.placements('object')
+        return self._objects
+
+    def placements(self, layer):
+        if layer not in self.layers:
+            return []
+        return [(value, col, row) for col, row, value in self.cells(layer)]
+
+    def cell(self, layer, col, row):
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.layers[layer][row * self.width + col]
+        return -1
+
+    def cells(self, layer):
+        if hasattr(self.layers[layer], 'cells'):
+            yield from self.layers[layer].cells()
+            return
+        width = self.width
+        for index, value in enumerate(self.layers[layer]):
+            if value != -1:
+                yield index % width, index // width, value
+
+    def is_blocked(self, col, row, mask=BLOCK_BOUNDARY | BLOCK_OBJECT | BLOCK_GRASS):
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.blocked[row * self.width + col] & mask
+        return True
+
+
+def load_csv_level(layer_paths, floor=()):
+    layouts = {name: import_csv_layout(path) for name, path in layer_paths.items()}
+    height = max(len(layout) for layout in layouts.values())
+    width = max(len(row) for layout in layouts.values() for row in layout)
+    layers = {}
+    for name, layout in layouts.items():
+        layer = array('h', [-1]) * (width * height)
+        for row_idx, row in enumerate(layout):
+            for col_idx, col in enumerate(row):
+                layer[row_idx * width + col_idx] = int(col)
+        layers[name] = layer
+    return LevelData(width, height, layers, floor=floor)
+
+
+def load_tmx_level(path, layer_names, floor_names=()):
+    # tile layers stay tile layers, object groups become placement lists. A
+    # floor layer is split into one layer per tileset it is painted from,
+    # each drawn with the tileset the map names
+    tmx_map = TmxMap(path)
+    layers = {}
+    placements = {}
+    for name, tmx_name in layer_names.items():
+        if tmx_name in tmx_map.layers:
+            layers[name] = tmx_map.get_layer(tmx_name)
+        elif tmx_name in tmx_map.object_groups:
+            placements[name] = tmx_map.get_placements(tmx_name)
+    floor = []
+    for tmx_name in floor_names:
+        for firstgid, source in tmx_map.get_tilesets(tmx_name):
+            name = f'floor{len(floor)}'
+            layers[name] = tmx_map.get_layer(tmx_name, firstgid)
+            floor.append((name, os.path.relpath(source, get_path('.')).replace(os.sep, '/')))
+    return LevelData(tmx_map.width, tmx_map.height, layers,
+                     spawns=placements.get('entities'), objects=placements.get('object'), floor=floor)
+
+
+def source_paths(level_map):
+    if 'tmx' in level_map:
+        return [level_map['tmx']]
+    return list(level_map['layers'].values())
+
+
+def load_source(level_map):
+    if 'tmx' in level_map:
+        return load_tmx_level(level_map['tmx'], level_map['layers'], level_map.get('floor', []))
+    return load_csv_level(level_map['layers'], level_map.get('floor', []))
+
+
+def write_package(data, path):
+    names = list(data.layers)
+    with open(get_path(path), 'wb') as package:
+        package.write(HEADER.pack(MAGIC, data.width, data.height, len(names),
+                                  len(data.spawns), len(data.objects), len(data.floor)))
+        for name in names:
+            package.write(LAYER_NAME.pack(name.encode()))
+        for name in names:
+            layer = array('h', data.layers[name])
+            if sys.byteorder != 'little':
+                layer.byteswap()
+            package.write(layer.tobytes())
+        package.write(bytes(data.blocked))
+        for placement in data.spawns + data.objects:
+            package.write(PLACEMENT.pack(*placement))
+        for name, tileset_path in data.floor:
+            encoded = tileset_path.encode()
+            package.write(LAYER_NAME.pack(name.encode()) + PATH_LENGTH.pack(len(encoded)) + encoded)
+
+
+def load_package(path):
+    # layers stay views into the mapped file; the small collision grid is
+    # copied since grass being cut changes it at runtime
+    with open(path, 'rb') as package:
+        buffer = mmap.mmap(package.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, width, height, layer_count, spawn_count, object_count, floor_count = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a level package of this version')
+    offset = HEADER.size
+
+    names = []
+    for _ in range(layer_count):
+        names.append(LAYER_NAME.unpack_from(buffer, offset)[0].rstrip(b'\0').decode())
+        offset += LAYER_NAME.size
+
+    view = memoryview(buffer)
+    size = width * height
+    layers = {}
+    for name in names:
+        raw = view[offset:offset + size * 2]
+        if sys.byteorder == 'little':
+            layers[name] = raw.cast('h')
+        else:
+            layers[name] = array('h', raw)
+            layers[name].byteswap()
+        offset += size * 2
+    blocked = bytearray(view[offset:offset + size])
+    offset += size
+
+    placements = [PLACEMENT.unpack_from(buffer, offset + i * PLACEMENT.size) for i in range(spawn_count + object_count)]
+    offset += len(placements) * PLACEMENT.size
+
+    floor = []
+    for _ in range(floor_count):
+        name = LAYER_NAME.unpack_from(buffer, offset)[0].rstrip(b'\0').decode()
+        offset += LAYER_NAME.size
+        length, = PATH_LENGTH.unpack_from(buffer, offset)
+        offset += PATH_LENGTH.size
+        floor.append((name, bytes(buffer[offset:offset + length]).decode()))
+        offset += length
+    return LevelData(width, height, layers, blocked, placements[:spawn_count], placements[spawn_count:], floor)
+
+
+def load_level(name):
+    # the compiled package is used when it is newer than the map sources and
+    # was written by this version, otherwise the tmx map or the csv layers are
+    # read
+    level_map = level_maps[name]
+    package_path = get_path(level_map['package'])
+    if os.path.exists(package_path):
+        package_time = os.path.getmtime(package_path)
+        if all(os.path.getmtime(get_path(path)) <= package_time for path in source_paths(level_map)):
+            try:
+                return load_package(package_path)
+            except ValueError:
+                # written by an older compiler, so it may miss what this one adds
+                pass
+    return load_source(level_map)
+
+
+if __name__ == '__main__':
+    # level compiler: python level_data.py [level_name ...]
+    for level_name in sys.argv[1:] or list(level_maps):
+        level_data = load_source(level_maps[level_name])
+        write_package(level_data, level_maps[level_name]['package'])
+        print(f'compiled {level_name}: {level_data.width}x{level_data.height}, '
+              f'{len(level_data.spawns)} spawns, {len(level_data.objects)} objects')
@@ -0,0 +1,51 @@
+import pygame
+from concurrent.futures import ThreadPoolExecutor
+from settings import *
+from asset_pack import collect_folders, load_pack
+from support import import_folder
+from level import Level
+
+
+class LevelLoader:
+    # decodes the frame folders on worker threads and then builds the level
+    # on one of them, so the splash and home screens hide the loading time
+    def __init__(self, workers=LOADER_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # in low memory mode frames are only loaded once something needs them
+        self.folders = [] if LOW_MEMORY_MODE else collect_folders()
+        self.tasks = []
+        self.level_task = None
+
+    def start(self):
+        load_pack()
+        self.tasks = [self.executor.submit(import_folder, folder, flip) for folder, flip in self.folders]
+        self.level_task = self.executor.submit(self.build_level)
+
+    def build_level(self):
+        for task in self.tasks:
+            task.result()
+        return Level()
+
+    def progress(self):
+        done = sum(task.done() for task in self.tasks) + self.level_task.done()
+        return done / (len(self.tasks) + 1)
+
+    def ready(self):
+        return self.level_task.done()
+
+    def result(self):
+        level = self.level_task.result()
+        self.executor.shutdown(wait=False)
+        return level
+
+
+def draw_progress(surface, progress):
+    width, height = surface.get_size()
+    bg_rect = pygame.Rect(0, 0, width // 3, BAR_HEIGHT)
+    bg_rect.midbottom = (width // 2, height - 30)
+    current_rect = bg_rect.copy()
+    current_rect.width = bg_rect.width * progress
+
+    pygame.draw.rect(surface, UI_BG_COLOR, bg_rect)
+    pygame.draw.rect(surface, BAR_COLOR, current_rect)
+    pygame.draw.rect(surface, UI_BORDER_COLOR, bg_rect, 3)
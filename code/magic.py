@@ -2,34 +2,30 @@ import pygame
 from settings import *
 from random import randint
 from support import get_path
+from audio import audio
 
 
 class MagicPlayer:
     def __init__(self, animation_player):
         self.animation_player = animation_player
-        self.sounds = {
-            'heal': pygame.mixer.Sound(magic_data['heal']['spell_sound']),
-            'flame': pygame.mixer.Sound(magic_data['flame']['spell_sound'])
-        }
-        self.sounds['heal'].set_volume(0.5)
-        self.sounds['flame'].set_volume(0.4)
+        self.volumes = {'heal': 0.5, 'flame': 0.4}
 
-    def heal(self, player, strength, cost, groups):
+    def heal(self, player, strength, cost):
         if player.energy >= cost:
-            self.sounds['heal'].play()
+            audio.play(magic_data['heal']['spell_sound'], self.volumes['heal'])
             player.health += strength
             player.energy -= cost
             if player.health >= player.stats['health']:
                 player.health = player.stats['health']
             self.animation_player.create_particles('aura',
-                                                   player.rect.center, groups)
+                                                   player.rect.center)
             self.animation_player.create_particles('heal',
-                                                   player.rect.center + pygame.math.Vector2(0, -20), groups)
+                                                   player.rect.center + pygame.math.Vector2(0, -20))
 
     def flame(self, player, cost, groups):
         if player.energy >= cost:
             player.energy -= cost
-            self.sounds['flame'].play()
+            audio.play(magic_data['flame']['spell_sound'], self.volumes['flame'])
 
             status = player.status.split('_')[0]
             if status == 'up':
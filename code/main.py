@@ -2,8 +2,9 @@ import pygame
 import sys
 import time
 from settings import *
-from level import Level
+from loading import LevelLoader, draw_progress
 from support import get_path
+from audio import music, MUSIC_END
 
 class Game:
     def __init__(self):
@@ -12,21 +13,44 @@ class Game:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
         self.clock = pygame.time.Clock()
 
+        self.loader = LevelLoader()
+        self.loader.start()
         self.show_splash_screen()
         self.home()
+        self.wait_for_level()
 
-        self.level = Level()
+        self.level = self.loader.result()
         self.game_over = False
         self.font = pygame.font.Font(None, 240)
         self.button_font = pygame.font.Font(None, 40)
         self.restart_button = pygame.Rect(WIDTH // 2 - 110, HEIGHT // 2 + 50, 100, 50)
         self.quit_button = pygame.Rect(WIDTH // 2 + 10, HEIGHT // 2 + 50, 100, 50)
-        main_sound = pygame.mixer.Sound(get_path('../audio/main.ogg'))
-        main_sound.set_volume(0.5)
-        main_sound.play(loops=-1)
+        music.play_level(self.level.name)
+
+    def wait(self, duration, draw=None):
+        # like pygame.time.delay, but keeps the window responsive and the
+        # loading bar moving while the level is built in the background
+        end_time = pygame.time.get_ticks() + duration
+        while pygame.time.get_ticks() < end_time:
+            self.present(draw)
+
+    def present(self, draw=None):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        if draw:
+            draw()
+        draw_progress(self.screen, self.loader.progress())
+        pygame.display.update()
+        self.clock.tick(FPS)
+
+    def wait_for_level(self):
+        while not self.loader.ready():
+            self.present(lambda: self.screen.fill('black'))
 
     def show_splash_screen(self):
-        pygame.time.delay(1000)
+        self.wait(1000, lambda: self.screen.fill('black'))
         logo = pygame.image.load(get_path('../graphics/syntax.png')).convert_alpha()
         logo = pygame.transform.scale(logo, (1200, 700))  # Resize as needed
         logo_rect = logo.get_rect(center=(WIDTH // 2, HEIGHT // 2))
@@ -34,23 +58,20 @@ class Game:
         fade_surface = pygame.Surface((WIDTH, HEIGHT))
         fade_surface.fill('black')
 
-        for alpha in range(255, -1, -5):  # From black to visible
+        def draw_logo():
             self.screen.fill('black')
             self.screen.blit(logo, logo_rect)
-            fade_surface.set_alpha(alpha)
             self.screen.blit(fade_surface, (0, 0))
-            pygame.display.update()
-            pygame.time.delay(20)
 
-        pygame.time.delay(5000)
+        for alpha in range(255, -1, -5):  # From black to visible
+            fade_surface.set_alpha(alpha)
+            self.wait(20, draw_logo)
+
+        self.wait(5000, draw_logo)
 
         for alpha in range(0, 256, 5):  # From visible to black
-            self.screen.fill('black')
-            self.screen.blit(logo, logo_rect)
             fade_surface.set_alpha(alpha)
-            self.screen.blit(fade_surface, (0, 0))
-            pygame.display.update()
-            pygame.time.delay(20)
+            self.wait(20, draw_logo)
 
     def home(self):
         # Load the background poster
@@ -80,6 +101,8 @@ class Game:
             self.screen.blit(scaled_poster, poster_rect)
             pygame.draw.rect(self.screen, 'white', self.play_button, border_radius=12)
             self.screen.blit(play_text, play_text.get_rect(center=self.play_button.center))
+            if not self.loader.ready():
+                draw_progress(self.screen, self.loader.progress())
 
             pygame.display.update()
 
@@ -142,6 +165,8 @@ class Game:
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_m:
                         self.level.toggle_menu()
+                elif event.type == MUSIC_END:
+                    music.handle_event(event)
                 if self.game_over:
                     self.handle_buttons(event)
 
@@ -1,67 +1,117 @@
 import pygame
+from array import array
+from settings import LOW_MEMORY_MODE, PARTICLE_BUDGET
 from support import get_path, import_folder
 from random import choice
 
 
+particle_folders = {
+    # magic
+    'flame': '../graphics/particles/flame/frames',
+    'aura': '../graphics/particles/aura',
+    'heal': '../graphics/particles/heal/frames',
+
+    # attacks
+    'claw': '../graphics/particles/claw',
+    'slash': '../graphics/particles/slash',
+    'sparkle': '../graphics/particles/sparkle',
+    'leaf_attack': '../graphics/particles/leaf_attack',
+    'thunder': '../graphics/particles/thunder',
+
+    # monster deaths
+    'squid': '../graphics/particles/smoke_orange',
+    'raccoon': '../graphics/particles/raccoon',
+    'spirit': '../graphics/particles/nova',
+    'bamboo': '../graphics/particles/bamboo',
+}
+
+# leafs, each set also used mirrored
+leaf_folders = [(f'../graphics/particles/leaf{number}', flip) for flip in (False, True) for number in range(1, 7)]
+
+
 class AnimationPlayer:
-    def __init__(self):
-        self.frames = {
-            # magic
-            'flame': import_folder('../graphics/particles/flame/frames'),
-            'aura': import_folder('../graphics/particles/aura'),
-            'heal': import_folder('../graphics/particles/heal/frames'),
-
-            # attacks
-            'claw': import_folder('../graphics/particles/claw'),
-            'slash': import_folder('../graphics/particles/slash'),
-            'sparkle': import_folder('../graphics/particles/sparkle'),
-            'leaf_attack': import_folder('../graphics/particles/leaf_attack'),
-            'thunder': import_folder('../graphics/particles/thunder'),
-
-            # monster deaths
-            'squid': import_folder('../graphics/particles/smoke_orange'),
-            'raccoon': import_folder('../graphics/particles/raccoon'),
-            'spirit': import_folder('../graphics/particles/nova'),
-            'bamboo': import_folder('../graphics/particles/bamboo'),
-
-            # leafs
-            'leaf': (
-                import_folder('../graphics/particles/leaf1'),
-                import_folder('../graphics/particles/leaf2'),
-                import_folder('../graphics/particles/leaf3'),
-                import_folder('../graphics/particles/leaf4'),
-                import_folder('../graphics/particles/leaf5'),
-                import_folder('../graphics/particles/leaf6'),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf1')),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf2')),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf3')),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf4')),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf5')),
-                self.reflect_images(import_folder(
-                    '../graphics/particles/leaf6')),
-            )
-        }
-
-    def reflect_images(self, frames):
-        new_frames = []
-        for frame in frames:
-            flipped_frame = pygame.transform.flip(frame, True, False)
-            new_frames.append(flipped_frame)
-
-        return new_frames
-
-    def create_grass_particles(self, pos, groups):
-        grass_animation_frames = choice(self.frames['leaf'])
-        ParticleEffect(pos, grass_animation_frames, groups)
-
-    def create_particles(self, animation_type, pos, groups):
-        animation_frames = self.frames[animation_type]
-        ParticleEffect(pos, animation_frames, groups)
+    # effects go to the particle engine; only effects that have to take part
+    # in collisions (flame) are still made as sprites in the given groups
+    def __init__(self, engine):
+        self.engine = engine
+        self.frames = {}
+        if not LOW_MEMORY_MODE:
+            for animation_type, path in particle_folders.items():
+                self.frames[animation_type] = import_folder(path)
+            self.frames['leaf'] = tuple(import_folder(path, flip) for path, flip in leaf_folders)
+
+    def get_frames(self, animation_type):
+        if LOW_MEMORY_MODE:
+            # looked up on every use so the frame cache can evict idle sets
+            return import_folder(particle_folders[animation_type])
+        return self.frames[animation_type]
+
+    def get_leaf_frames(self):
+        if LOW_MEMORY_MODE:
+            return import_folder(*choice(leaf_folders))
+        return choice(self.frames['leaf'])
+
+    def create_grass_particles(self, pos):
+        self.engine.emit(pos, self.get_leaf_frames())
+
+    def create_particles(self, animation_type, pos, groups=None):
+        animation_frames = self.get_frames(animation_type)
+        if groups:
+            ParticleEffect(pos, animation_frames, groups)
+        else:
+            self.engine.emit(pos, animation_frames)
+
+
+class ParticleEngine:
+    # all running effects as parallel arrays, oldest first, each pointing at
+    # a shared frame list; advanced in one pass and drawn in one blits call.
+    # Past PARTICLE_BUDGET the oldest effects are dropped
+    animation_speed = 15
+
+    def __init__(self, budget=PARTICLE_BUDGET):
+        self.budget = budget
+        self.x = array('i')
+        self.y = array('i')
+        self.frame = array('f')
+        self.frames = []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def emit(self, pos, frames):
+        self.x.append(int(pos[0]))
+        self.y.append(int(pos[1]))
+        self.frame.append(0)
+        self.frames.append(frames)
+        excess = len(self.frames) - self.budget
+        if excess > 0:
+            for values in (self.x, self.y, self.frame, self.frames):
+                del values[:excess]
+
+    def update(self, dt):
+        # finished effects are squeezed out in the same pass, keeping order
+        step = self.animation_speed * dt
+        x, y, frame, frames = self.x, self.y, self.frame, self.frames
+        kept = 0
+        for index in range(len(frames)):
+            next_frame = frame[index] + step
+            if next_frame < len(frames[index]):
+                x[kept] = x[index]
+                y[kept] = y[index]
+                frame[kept] = next_frame
+                frames[kept] = frames[index]
+                kept += 1
+        for values in (x, y, frame, frames):
+            del values[kept:]
+
+    def draw(self, surface, offset, view_rect):
+        blits = []
+        for index in range(len(self.frames)):
+            x, y = self.x[index], self.y[index]
+            if view_rect.collidepoint(x, y):
+                image = self.frames[index][int(self.frame[index])]
+                blits.append((image, (x - offset.x - image.get_width() // 2, y - offset.y - image.get_height() // 2)))
+        surface.blits(blits, False)
 
 
 class ParticleEffect(pygame.sprite.Sprite):
@@ -0,0 +1,180 @@
+import pygame
+from array import array
+from heapq import heapify, heappush, heappop
+from settings import *
+
+UNREACHED = 0x7fffffff
+# step costs, close enough to 1 and sqrt(2) to keep paths natural
+STRAIGHT = 2
+DIAGONAL = 3
+NEIGHBOURS = [
+    (1, 0, STRAIGHT), (-1, 0, STRAIGHT), (0, 1, STRAIGHT), (0, -1, STRAIGHT),
+    (1, 1, DIAGONAL), (-1, 1, DIAGONAL), (1, -1, DIAGONAL), (-1, -1, DIAGONAL),
+]
+
+
+class FlowField:
+    # distance to the player over the collision grid, shared by all enemies;
+    # it grows from the open cells under the player's hitbox, so a player
+    # standing half in a blocked cell is still reached through the other
+    # half. When those cells change the next field is built in a
+    # second buffer, FLOW_FIELD_BUDGET cells a frame, and swapped in once it
+    # is done; an obstacle that disappears is patched into both in place
+    def __init__(self, level_data, radius=FLOW_FIELD_RADIUS, budget=FLOW_FIELD_BUDGET):
+        self.level_data = level_data
+        self.width = level_data.width
+        self.height = level_data.height
+        self.max_cost = radius * STRAIGHT
+        self.budget = budget
+        self.cost = array('i', [UNREACHED]) * (self.width * self.height)
+        self.reached = []
+        self.waypoints = {}
+        self.target = None
+
+        # heap entries are cost << shift | cell index, plain ints being quicker
+        # to order and leaving the garbage collector nothing to track
+        self.shift = (self.width * self.height).bit_length()
+        self.index_mask = (1 << self.shift) - 1
+
+        # the field being built and the cells still to settle
+        self.next_cost = array('i', [UNREACHED]) * (self.width * self.height)
+        self.next_reached = []
+        self.frontier = []
+        self.building = None
+
+        # bit i of a cell's step mask is set when NEIGHBOURS[i] can be walked
+        # to from it, worked out once here and again only around a cell that
+        # opens up; every mask maps to its (index offset, cost) moves
+        self.step_masks = bytearray(self.width * self.height)
+        for index in range(self.width * self.height):
+            self.refresh_mask(index)
+        self.moves = [[(dy * self.width + dx, step) for bit, (dx, dy, step) in enumerate(NEIGHBOURS) if mask >> bit & 1]
+                      for mask in range(1 << len(NEIGHBOURS))]
+
+    def can_step(self, col, row, dx, dy):
+        blocked = self.level_data.is_blocked
+        if blocked(col + dx, row + dy):
+            return False
+        # no cutting corners past an obstacle
+        return not dx or not dy or not (blocked(col + dx, row) or blocked(col, row + dy))
+
+    def refresh_mask(self, index):
+        row, col = divmod(index, self.width)
+        mask = 0
+        for bit, (dx, dy, _) in enumerate(NEIGHBOURS):
+            if self.can_step(col, row, dx, dy):
+                mask |= 1 << bit
+        self.step_masks[index] = mask
+
+    def get_target(self, rect):
+        cells = tuple((col, row)
+                      for row in range(rect.top // TILESIZE, (rect.bottom - 1) // TILESIZE + 1)
+                      for col in range(rect.left // TILESIZE, (rect.right - 1) // TILESIZE + 1)
+                      if not self.level_data.is_blocked(col, row))
+        return cells or ((rect.centerx // TILESIZE, rect.centery // TILESIZE),)
+
+    def update(self, rect):
+        target = self.get_target(rect)
+        if self.target is None:
+            # nothing to steer by yet, so the first field is built at once
+            self.start(target)
+            self.spread(self.next_cost, self.next_reached, self.frontier)
+            self.publish()
+            return
+        if self.building is None and target != self.target:
+            self.start(target)
+        if self.building is not None and self.spread(self.next_cost, self.next_reached, self.frontier, self.budget):
+            self.publish()
+
+    def start(self, target):
+        self.building = target
+        for index in self.next_reached:
+            self.next_cost[index] = UNREACHED
+        self.next_reached = []
+        self.frontier = []
+
+        for col, row in target:
+            if 0 <= col < self.width and 0 <= row < self.height:
+                index = row * self.width + col
+                self.next_cost[index] = 0
+                self.next_reached.append(index)
+                self.frontier.append(index)
+        heapify(self.frontier)
+
+    def publish(self):
+        self.cost, self.next_cost = self.next_cost, self.cost
+        self.reached, self.next_reached = self.next_reached, self.reached
+        self.target = self.building
+        self.building = None
+        self.waypoints.clear()
+
+    def spread(self, cost, reached, frontier, budget=None):
+        # settles up to budget cells, True once the frontier is empty
+        max_cost = self.max_cost
+        moves = self.moves
+        step_masks = self.step_masks
+        shift = self.shift
+        index_mask = self.index_mask
+        while frontier:
+            if budget is not None:
+                if budget <= 0:
+                    return False
+                budget -= 1
+            entry = heappop(frontier)
+            current, index = entry >> shift, entry & index_mask
+            if current > cost[index]:
+                continue
+            for offset, step in moves[step_masks[index]]:
+                new_cost = current + step
+                neighbour = index + offset
+                if new_cost > max_cost or new_cost >= cost[neighbour]:
+                    continue
+                if cost[neighbour] == UNREACHED:
+                    reached.append(neighbour)
+                cost[neighbour] = new_cost
+                heappush(frontier, new_cost << shift | neighbour)
+        return True
+
+    def open_cell(self, col, row):
+        # an obstacle is gone: the step masks around it are worked out again
+        # and its neighbours spread into it, and past it to wherever it used
+        # to block the way
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if 0 <= col + dx < self.width and 0 <= row + dy < self.height:
+                    self.refresh_mask((row + dy) * self.width + col + dx)
+        if self.target is not None:
+            frontier = []
+            self.reopen(self.cost, col, row, frontier)
+            self.spread(self.cost, self.reached, frontier)
+            self.waypoints.clear()
+        if self.building is not None:
+            self.reopen(self.next_cost, col, row, self.frontier)
+
+    def reopen(self, cost, col, row, frontier):
+        for dx, dy, _ in NEIGHBOURS:
+            neighbour_col, neighbour_row = col + dx, row + dy
+            if 0 <= neighbour_col < self.width and 0 <= neighbour_row < self.height:
+                index = neighbour_row * self.width + neighbour_col
+                if cost[index] != UNREACHED:
+                    heappush(frontier, cost[index] << self.shift | index)
+
+    def next_waypoint(self, pos):
+        # center of the neighbouring tile one step closer to the player; None
+        # in a tile under the player or off the field
+        col, row = int(pos[0]) // TILESIZE, int(pos[1]) // TILESIZE
+        if not (0 <= col < self.width and 0 <= row < self.height):
+            return None
+        index = row * self.width + col
+        if index not in self.waypoints:
+            best = self.cost[index]
+            waypoint = None
+            if 0 < best < UNREACHED:
+                for offset, _ in self.moves[self.step_masks[index]]:
+                    neighbour = self.cost[index + offset]
+                    if neighbour < best:
+                        best = neighbour
+                        neighbour_row, neighbour_col = divmod(index + offset, self.width)
+                        waypoint = pygame.math.Vector2((neighbour_col + 0.5) * TILESIZE, (neighbour_row + 0.5) * TILESIZE)
+            self.waypoints[index] = waypoint
+        return self.waypoints[index]
@@ -0,0 +1,51 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# status codes of the batched pass
+STATUSES = ('idle', 'move', 'attack')
+
+
+class Perception:
+    # distance and direction to the player for every ticking enemy in one
+    # numpy pass; the radii only change with the roster, so they are kept
+    # between frames, while positions are read from the rects every frame
+    # since the sprites move themselves. Without numpy every enemy senses on
+    # its own. An enemy only notices the player when it can see them
+    def __init__(self, sight):
+        self.sight = sight
+        self.roster = []
+        self.attack_radius = None
+        self.notice_radius = None
+
+    def load_roster(self, enemies):
+        if enemies != self.roster:
+            self.roster = enemies
+            self.attack_radius = numpy.array([enemy.attack_radius for enemy in enemies], dtype=float)
+            self.notice_radius = numpy.array([enemy.notice_radius for enemy in enemies], dtype=float)
+
+    def update(self, enemies, player):
+        if not enemies:
+            return
+        if numpy is None:
+            for enemy in enemies:
+                distance, enemy.player_direction = enemy.get_player_distance_direction(player)
+                in_sight = distance > enemy.notice_radius or self.sight.visible(enemy.rect.center, player.rect.center)
+                enemy.get_status(distance, in_sight)
+                enemy.actions()
+            return
+
+        self.load_roster(enemies)
+        offset = numpy.array(player.rect.center, dtype=float) - numpy.array([enemy.rect.center for enemy in enemies], dtype=float)
+        distance = numpy.hypot(offset[:, 0], offset[:, 1])
+        direction = offset / numpy.where(distance > 0, distance, 1)[:, None]
+        can_attack = numpy.fromiter((enemy.can_attack for enemy in enemies), dtype=bool, count=len(enemies))
+        status = numpy.where((distance <= self.attack_radius) & can_attack, 2, (distance <= self.notice_radius).astype(int))
+
+        for enemy, code, (x, y) in zip(enemies, status.tolist(), direction.tolist()):
+            if code and not self.sight.visible(enemy.rect.center, player.rect.center):
+                code = 0
+            enemy.set_status(STATUSES[code])
+            enemy.player_direction.update(x, y)
+            enemy.actions()
@@ -1,15 +1,16 @@
 import pygame
 import sys
-from settings import HITBOX_OFFSET, weapon_data, magic_data
-from support import get_path, import_folder
+from settings import HITBOX_OFFSET, weapon_data, magic_data, weapon_sound_path
+from support import get_path, import_folder, load_image
 from entity import Entity
+from audio import audio
+from spatial import SpatialGroup
 
 
 class Player(Entity):
     def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack, create_magic):
         super().__init__(groups, pos)
-        player_path = get_path('../graphics/test/player.png')
-        self.image = pygame.image.load(player_path).convert_alpha()
+        self.image = load_image('../graphics/test/player.png')
         self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(-6, HITBOX_OFFSET['player'])
 
@@ -20,8 +21,7 @@ class Player(Entity):
         self.shield_image = None
 
         # Load shield image
-        shield_path = get_path('../graphics/player/shield/shield-1.png')
-        self.shield_image = pygame.image.load(shield_path).convert_alpha()
+        self.shield_image = load_image('../graphics/player/shield/shield-1.png')
 
         # movement
         self.attacking = False
@@ -78,10 +78,6 @@ class Player(Entity):
         self.hurt_time = None
         self.invulnerability_duration = 500
 
-        # sound
-        self.weapon_attack_sound = pygame.mixer.Sound(get_path('../audio/sword.wav'))
-        self.weapon_attack_sound.set_volume(0.2)
-
     def import_player_assets(self):
         character_path = get_path('../graphics/player')
         self.animations = {
@@ -122,7 +118,7 @@ class Player(Entity):
                 self.attacking = True
                 self.attack_time = pygame.time.get_ticks()
                 self.create_attack()
-                self.weapon_attack_sound.play()
+                audio.play(weapon_sound_path, 0.2)
                 self.direction.x = 0
                 self.direction.y = 0
 
@@ -193,12 +189,8 @@ class Player(Entity):
         self.frame_index += self.animation_speed * dt
         if self.frame_index >= len(animation):
             self.frame_index = 0
-        self.image = animation[int(self.frame_index)]
+        self.image = self.flicker(animation[int(self.frame_index)])
         self.rect = self.image.get_rect(center=self.hitbox.center)
-        if not self.vulnerable:
-            self.image.set_alpha(self.wave_value())
-        else:
-            self.image.set_alpha(255)
 
     def get_shield_rect(self):
         if self.shield and self.shield_image:
@@ -250,7 +242,7 @@ def game_loop():
     player = Player(
         pos=(400, 300),
         groups=[],
-        obstacle_sprites=[],
+        obstacle_sprites=SpatialGroup(rect_attr='hitbox'),
         create_attack=lambda: None,
         destroy_attack=lambda: None,
         create_magic=lambda style, strength, cost: None
@@ -0,0 +1,31 @@
+from settings import *
+
+
+class EnemyPool:
+    # enemies that died or were parked wait here per monster type; spawning
+    # resets one and puts it back in its groups instead of building a new one
+    def __init__(self, create_enemy, groups):
+        self.create_enemy = create_enemy
+        self.groups = groups
+        self.free = {name: [] for name in monster_data}
+
+    def prewarm(self, count=ENEMY_POOL_SIZE):
+        # built up front so the first spawns of a type cost nothing either
+        for name, free in self.free.items():
+            while len(free) < count:
+                enemy = self.create_enemy(name, (0, 0))
+                enemy.kill()
+                free.append(enemy)
+
+    def acquire(self, monster_name, pos):
+        free = self.free[monster_name]
+        if not free:
+            return self.create_enemy(monster_name, pos)
+        enemy = free.pop()
+        enemy.reset(pos)
+        enemy.add(self.groups)
+        return enemy
+
+    def release(self, enemy):
+        enemy.kill()
+        self.free[enemy.monster_name].append(enemy)
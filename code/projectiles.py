@@ -0,0 +1,97 @@
+import pygame
+from math import atan2, degrees, hypot
+from array import array
+from settings import *
+from support import load_image
+
+
+class ProjectileSystem:
+    # every projectile is a slot in a few packed arrays instead of a sprite;
+    # one pass moves them all by dt, sweeps them through the collision grid,
+    # hit-tests the player and drops the expired ones by swapping the last
+    # slot into their place
+    def __init__(self, level_data, damage_player):
+        self.level_data = level_data
+        self.damage_player = damage_player
+        self.kinds = list(projectile_data)
+        self.x = array('d')
+        self.y = array('d')
+        self.dir_x = array('d')
+        self.dir_y = array('d')
+        self.spawn_time = array('q')
+        self.kind = array('B')
+        self.angle = array('H')
+
+        # images turned once per direction step, looked up by angle index
+        self.images = []
+        for name in self.kinds:
+            image = load_image(projectile_data[name]['graphic'])
+            self.images.append([pygame.transform.rotate(image, -step * 360 / PROJECTILE_ROTATIONS)
+                                for step in range(PROJECTILE_ROTATIONS)])
+
+    def __len__(self):
+        return len(self.x)
+
+    def fire(self, name, pos, direction):
+        if direction.length_squared() == 0:
+            return
+        direction = direction.normalize()
+        self.x.append(pos[0])
+        self.y.append(pos[1])
+        self.dir_x.append(direction.x)
+        self.dir_y.append(direction.y)
+        self.spawn_time.append(pygame.time.get_ticks())
+        self.kind.append(self.kinds.index(name))
+        self.angle.append(round(degrees(atan2(direction.y, direction.x)) * PROJECTILE_ROTATIONS / 360) % PROJECTILE_ROTATIONS)
+
+    def remove(self, index):
+        last = len(self.x) - 1
+        for values in (self.x, self.y, self.dir_x, self.dir_y, self.spawn_time, self.kind, self.angle):
+            values[index] = values[last]
+            values.pop()
+
+    def swept_blocked(self, x, y, new_x, new_y):
+        # samples the path at most half a tile apart so nothing tunnels
+        # through a wall, however long the frame was; objects block every cell
+        # their hitbox covers, so sticks stop at trees and statues as the old
+        # rect test did
+        steps = int(hypot(new_x - x, new_y - y) // (TILESIZE / 2)) + 1
+        blocked = self.level_data.is_blocked
+        for step in range(1, steps + 1):
+            t = step / steps
+            if blocked(int(x + (new_x - x) * t) // TILESIZE, int(y + (new_y - y) * t) // TILESIZE):
+                return True
+        return False
+
+    def update(self, dt, player):
+        current_time = pygame.time.get_ticks()
+        player_x, player_y = player.rect.center
+        index = len(self.x) - 1
+        # walking backwards keeps the swap-remove from skipping a slot
+        while index >= 0:
+            data = projectile_data[self.kinds[self.kind[index]]]
+            x, y = self.x[index], self.y[index]
+            new_x = x + self.dir_x[index] * data['speed'] * dt
+            new_y = y + self.dir_y[index] * data['speed'] * dt
+            hit_box = player.hitbox.inflate(data['size'], data['size'])
+
+            if hit_box.clipline(x, y, new_x, new_y):
+                self.damage_player(data['damage'], data['attack_type'])
+                self.remove(index)
+            elif (self.swept_blocked(x, y, new_x, new_y)
+                  or current_time - self.spawn_time[index] > data['lifetime']
+                  or hypot(new_x - player_x, new_y - player_y) > PROJECTILE_CULL_DISTANCE):
+                self.remove(index)
+            else:
+                self.x[index] = new_x
+                self.y[index] = new_y
+            index -= 1
+
+    def draw(self, surface, offset, view_rect):
+        blits = []
+        for index in range(len(self.x)):
+            x, y = self.x[index], self.y[index]
+            if view_rect.collidepoint(x, y):
+                image = self.images[self.kind[index]][self.angle[index]]
+                blits.append((image, (x - offset.x - image.get_width() // 2, y - offset.y - image.get_height() // 2)))
+        surface.blits(blits, False)
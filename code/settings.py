@@ -13,6 +13,111 @@ HITBOX_OFFSET = {
     'invisible': 0
 }
 
+# pixel-precise attacks: rect hits are confirmed against masks made once per
+# frame when it is loaded
+MASK_HIT_MODE = False
+
+# extra room around the screen when picking sprites to draw
+CULL_MARGIN = TILESIZE
+# keep tiles pre-sorted and only re-sort moving sprites (False: full sort)
+YSORT_INCREMENTAL = True
+
+# the floor is cached in chunks of this many tiles
+FLOOR_CHUNK_TILES = 8
+
+# pre-built animation atlas, written by `python asset_pack.py`
+ASSET_PACK_PATH = '../data/assets.pack'
+ATLAS_SIZE = 2048
+ATLAS_FOLDERS = [
+    '../graphics/player',
+    '../graphics/monsters',
+    '../graphics/particles',
+    '../graphics/grass',
+    '../graphics/objects',
+]
+ATLAS_FLIPPED = [f'../graphics/particles/leaf{number}' for number in range(1, 7)]
+
+# low memory mode: monster and particle frames are loaded on demand and kept
+# in an LRU cache of FRAME_CACHE_BUDGET bytes; sets of monster types that are
+# not within FRAME_CACHE_RADIUS of the player are the first to go
+LOW_MEMORY_MODE = False
+FRAME_CACHE_BUDGET = 8 * 1024 * 1024
+FRAME_CACHE_RADIUS = 1600
+FRAME_CACHE_INTERVAL = 1000
+FRAME_CACHE_ROOTS = ['../graphics/monsters', '../graphics/particles']
+SHOW_MEMORY = False
+
+# threads decoding assets while the splash and home screens are up
+LOADER_WORKERS = 4
+
+# map layers per level; `python level_data.py` compiles them into the package.
+# a level can come from a Tiled map instead: give it a 'tmx' path and map each
+# layer to the name of a tile layer or object group in that map. 'floor' lists
+# the layers drawn as the floor, bottom first: csv layers with the tileset of
+# each, for a tmx map just the names of its tile layers since the map says
+# which tilesets they are painted from
+level_maps = {
+    'level_0': {
+        'package': '../data/map/level_0.lvl',
+        'layers': {
+            'boundary': '../data/map/map_FloorBlocks.csv',
+            'grass': '../data/map/map_Grass.csv',
+            'object': '../data/map/map_Objects.csv',
+            'entities': '../data/map/map_Entities.csv',
+            'floor': '../data/map/map_Floor.csv',
+            'details': '../data/map/map_Details.csv',
+        },
+        'floor': [
+            ('floor', '../data/levels/tilesets/Floor.tsx'),
+            ('details', '../data/levels/tilesets/details.tsx'),
+        ],
+    },
+}
+
+# world streaming: the map is split into chunks of STREAM_CHUNK_TILES tiles and
+# only chunks up to STREAM_RADIUS chunks away from the player have sprites
+STREAM_CHUNK_TILES = 16
+STREAM_RADIUS = 1
+
+# enemies path to the player over a flow field reaching this many tiles out;
+# a new field settles at most FLOW_FIELD_BUDGET cells a frame
+FLOW_FIELD_RADIUS = 24
+FLOW_FIELD_BUDGET = 600
+
+# enemy activity levels: active within notice_radius + ACTIVE_MARGIN or on
+# screen, dormant (one step every DORMANT_TICK seconds) up to DORMANT_RADIUS,
+# asleep beyond that; re-picked every ACTIVITY_INTERVAL ms
+ACTIVE_MARGIN = TILESIZE * 2
+DORMANT_RADIUS = 1600
+DORMANT_TICK = 0.1
+ACTIVITY_INTERVAL = 250
+
+# entity store mode (needs numpy): enemies are kept as rows of typed arrays and
+# only the ones within reach or on screen are turned into sprites
+ENEMY_STORE_MODE = False
+
+# chasing enemies keep this far apart, pushed off each other with this weight
+SEPARATION_RADIUS = 48
+SEPARATION_WEIGHT = 0.8
+
+# line of sight results kept per (enemy tile, player tile) pair
+SIGHT_CACHE_SIZE = 4096
+
+# enemy pool: enemies built per monster type while the level loads
+ENEMY_POOL_SIZE = 4
+
+# spawn director: one monster every SPAWN_INTERVAL ms at a map spawn point at
+# least SPAWN_MIN_DISTANCE px from the player, while its chunk has fewer than
+# SPAWN_AREA_CAP and the streamed-in world fewer than SPAWN_TOTAL_CAP enemies
+SPAWN_INTERVAL = 8000
+SPAWN_MIN_DISTANCE = 800
+SPAWN_AREA_CAP = 6
+SPAWN_TOTAL_CAP = 40
+
+# ids used in the entities layer
+PLAYER_ID = 394
+entity_ids = {390: 'bamboo', 391: 'spirit', 392: 'raccoon', 393: 'squid'}
+
 # ui
 BAR_HEIGHT = 20
 HEALTH_BAR_WIDTH = 200
@@ -21,6 +126,17 @@ ITEM_BOX_SIZE = 80
 UI_FONT = get_path('../font/joystix.ttf')
 UI_FONT_SIZE = 18
 
+# audio
+HEARING_RADIUS = 1100
+MAX_VOICES_PER_SOUND = 3
+
+# music, streamed per level
+MUSIC_VOLUME = 0.5
+MUSIC_FADE = 1500
+level_music = {
+    'level_0': ['../audio/main.ogg'],
+}
+
 # general colors
 WATER_COLOR = '#71ddee'
 UI_BG_COLOR = '#222222'
@@ -53,6 +169,8 @@ weapon_data = {
     'sai': {'cooldown': 80, 'damage': 10, 'graphic': sai_path}
 }
 
+weapon_sound_path = get_path('../audio/sword.wav')
+
 # magic
 flame_path = get_path('../graphics/particles/flame/fire.png')
 heal_path = get_path('../graphics/particles/heal/heal.png')
@@ -65,10 +183,22 @@ magic_data = {
     'heal': {'strength': 20, 'cost': 10, 'graphic': heal_path, 'spell_sound': heal_sound_path},
 }
 
+# projectiles: speed in px/s, lifetime in ms, size widens the hit test
+projectile_data = {
+    'stick': {'speed': 300, 'damage': 5, 'attack_type': 'claw', 'lifetime': 2000, 'size': 10, 'graphic': '../graphics/particles/stick.png'},
+}
+PROJECTILE_ROTATIONS = 32
+PROJECTILE_CULL_DISTANCE = 1600
+
+# most particle effects alive at once, the oldest give way first
+PARTICLE_BUDGET = 256
+
 # enemy
 slash_sound_path = get_path('../audio/attack/slash.wav')
 claw_sound_path = get_path('../audio/attack/claw.wav')
 fireball_sound_path = get_path('../audio/attack/fireball.wav')
+hit_sound_path = get_path('../audio/hit.wav')
+death_sound_path = get_path('../audio/death.wav')
 
 #from player import Player
 '''
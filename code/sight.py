@@ -0,0 +1,59 @@
+from settings import *
+
+
+class LineOfSight:
+    # grid DDA between tile centers over the collision grid; the answer only
+    # depends on the two tiles, so it is cached per tile pair until an
+    # obstacle changes
+    def __init__(self, level_data, cache_size=SIGHT_CACHE_SIZE):
+        self.level_data = level_data
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def invalidate(self):
+        self.cache.clear()
+
+    def visible(self, start_pos, end_pos):
+        start = (int(start_pos[0]) // TILESIZE, int(start_pos[1]) // TILESIZE)
+        end = (int(end_pos[0]) // TILESIZE, int(end_pos[1]) // TILESIZE)
+        # the ray runs center to center, so it is the same both ways
+        key = (start, end) if start <= end else (end, start)
+        result = self.cache.get(key)
+        if result is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            result = self.cache[key] = self.trace(*key)
+        return result
+
+    def trace(self, start, end):
+        blocked = self.level_data.is_blocked
+        col, row = start
+        end_col, end_row = end
+        step_col = 1 if end_col > col else -1
+        step_row = 1 if end_row > row else -1
+        # where along the ray the next column / row border is crossed, scaled
+        # to whole numbers so ties through a corner compare exactly; from a
+        # center the first border is half a tile away
+        cols = abs(end_col - col)
+        rows = abs(end_row - row)
+        next_col = rows if cols else float('inf')
+        next_row = cols if rows else float('inf')
+
+        while (col, row) != (end_col, end_row):
+            if next_col < next_row:
+                col += step_col
+                next_col += 2 * rows
+            elif next_row < next_col:
+                row += step_row
+                next_row += 2 * cols
+            else:
+                # straight through a corner: only closed if both sides are
+                if blocked(col + step_col, row) and blocked(col, row + step_row):
+                    return False
+                col += step_col
+                row += step_row
+                next_col += 2 * rows
+                next_row += 2 * cols
+            if (col, row) != (end_col, end_row) and blocked(col, row):
+                return False
+        return True
@@ -0,0 +1,135 @@
+import pygame
+from bisect import insort
+from operator import attrgetter
+from settings import TILESIZE
+
+
+centery = attrgetter('rect.centery')
+
+
+class SpatialHash:
+    def __init__(self, cell_size=TILESIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.keys = {}
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        left = rect.left // size
+        right = max(rect.right - 1, rect.left) // size
+        top = rect.top // size
+        bottom = max(rect.bottom - 1, rect.top) // size
+        return [(col, row) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+
+    def insert(self, item, rect):
+        keys = self.cells_for(rect)
+        self.keys[item] = keys
+        for key in keys:
+            self.cells.setdefault(key, {})[item] = None
+
+    def remove(self, item):
+        for key in self.keys.pop(item, ()):
+            cell = self.cells[key]
+            del cell[item]
+            if not cell:
+                del self.cells[key]
+
+    def move(self, item, rect):
+        # only touch the cells when the item actually crossed a cell border
+        if self.keys.get(item) != self.cells_for(rect):
+            self.remove(item)
+            self.insert(item, rect)
+
+    def query(self, rect):
+        found = {}
+        cells = self.cells
+        for key in self.cells_for(rect):
+            cell = cells.get(key)
+            if cell:
+                found.update(cell)
+        return found.keys()
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class SpatialGroup(pygame.sprite.Group):
+    # sprite group that keeps every member indexed by tile so lookups only
+    # touch the cells around the queried rect instead of the whole group
+    def __init__(self, *sprites, rect_attr='rect', cell_size=TILESIZE):
+        self.rect_attr = rect_attr
+        self.index = SpatialHash(cell_size)
+        # grid layers (like the grass) that answer hitboxes_near themselves
+        self.layers = []
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        rect = getattr(sprite, self.rect_attr, None)
+        if rect is not None:
+            self.index.insert(sprite, rect)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.index.remove(sprite)
+
+    def refresh(self, sprite):
+        self.index.move(sprite, getattr(sprite, self.rect_attr))
+
+    def nearby(self, rect):
+        return self.index.query(rect)
+
+    def hitboxes_near(self, rect):
+        for sprite in self.index.query(rect):
+            yield getattr(sprite, self.rect_attr)
+        for layer in self.layers:
+            yield from layer.hitboxes_near(rect)
+
+
+class YSortedGrid:
+    # static sprites bucketed by the cell holding their rect center, each
+    # bucket kept sorted by centery; rows split the map by centery, so
+    # walking the rows top to bottom hands out sprites in draw order
+    def __init__(self, cell_size=TILESIZE):
+        self.cell_size = cell_size
+        self.rows = {}
+        self.reach_x = 0
+        self.reach_y = 0
+
+    def bucket_key(self, sprite):
+        return sprite.rect.centerx // self.cell_size, sprite.rect.centery // self.cell_size
+
+    def insert(self, sprite):
+        col, row = self.bucket_key(sprite)
+        insort(self.rows.setdefault(row, {}).setdefault(col, []), sprite, key=centery)
+        # anything whose center is this far outside a rect may still overlap it
+        self.reach_x = max(self.reach_x, sprite.rect.width // 2 + 1)
+        self.reach_y = max(self.reach_y, sprite.rect.height // 2 + 1)
+
+    def remove(self, sprite):
+        col, row = self.bucket_key(sprite)
+        cols = self.rows[row]
+        cols[col].remove(sprite)
+        if not cols[col]:
+            del cols[col]
+            if not cols:
+                del self.rows[row]
+
+    def query(self, rect):
+        size = self.cell_size
+        search = rect.inflate(self.reach_x * 2, self.reach_y * 2)
+        col_range = range(search.left // size, search.right // size + 1)
+        visible = []
+        for row in range(search.top // size, search.bottom // size + 1):
+            cols = self.rows.get(row)
+            if not cols:
+                continue
+            row_sprites = []
+            for col in col_range:
+                bucket = cols.get(col)
+                if bucket:
+                    row_sprites += bucket
+            # the buckets are sorted runs, so this is a cheap run merge
+            row_sprites.sort(key=centery)
+            visible += [sprite for sprite in row_sprites if sprite.rect.colliderect(rect)]
+        return visible
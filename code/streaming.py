@@ -0,0 +1,134 @@
+import pygame
+from settings import *
+
+
+class ChunkState:
+    # what a chunk looks like while it has no sprites: its tiles and the
+    # enemies that were in it
+    def __init__(self):
+        self.boundary = []
+        self.objects = []
+        self.enemies = []
+
+
+class EnemyRoster:
+    # the streamed-in enemies, each one a full sprite from the pool
+    def __init__(self, pool):
+        self.pool = pool
+        self.sprites = []
+        self.activity_time = 0
+
+    def spawn(self, monster_name, pos, health):
+        enemy = self.pool.acquire(monster_name, pos)
+        enemy.health = health
+        self.sprites.append(enemy)
+
+    def positions(self):
+        return [enemy.rect.topleft for enemy in self.sprites if enemy.alive()]
+
+    def hitboxes(self):
+        return [enemy.hitbox for enemy in self.sprites if enemy.alive()]
+
+    def reap(self):
+        # enemies killed in combat go back to the pool
+        for enemy in [enemy for enemy in self.sprites if not enemy.alive()]:
+            self.sprites.remove(enemy)
+            self.pool.release(enemy)
+
+    def collect(self, keep):
+        # drops the dead and hands back (name, topleft, health) of every enemy
+        # whose topleft keep() says no to
+        self.reap()
+        parked = []
+        for enemy in [enemy for enemy in self.sprites if not keep(enemy.rect.topleft)]:
+            self.sprites.remove(enemy)
+            parked.append((enemy.monster_name, enemy.rect.topleft, enemy.health))
+            self.pool.release(enemy)
+        return parked
+
+    def update(self, dt, player_pos, view_rect):
+        # enemies the player could meet soon run every frame, the rest tick
+        # slower or sleep, so the frame cost follows the nearby enemies
+        self.reap()
+        current_time = pygame.time.get_ticks()
+        if current_time - self.activity_time < ACTIVITY_INTERVAL:
+            return
+        self.activity_time = current_time
+
+        player_pos = pygame.math.Vector2(player_pos)
+        for enemy in self.sprites:
+            distance = player_pos.distance_to(enemy.rect.center)
+            if distance <= enemy.notice_radius + ACTIVE_MARGIN or view_rect.colliderect(enemy.rect):
+                enemy.activity = 'active'
+            elif distance <= DORMANT_RADIUS:
+                enemy.activity = 'dormant'
+            else:
+                enemy.activity = 'asleep'
+
+
+class WorldStreamer:
+    # only chunks within STREAM_RADIUS of the player have live sprites;
+    # a chunk that falls out of range is folded back into its ChunkState
+    def __init__(self, level_data, create_tile, roster):
+        self.level_data = level_data
+        self.create_tile = create_tile
+        self.roster = roster
+        self.chunk_size = STREAM_CHUNK_TILES * TILESIZE
+        self.states = {}
+        self.loaded = {}
+        self.center = None
+
+        for col, row, _ in level_data.cells('boundary'):
+            self.get_state(col, row).boundary.append((col, row))
+        for object_id, col, row in level_data.objects:
+            self.get_state(col, row).objects.append((object_id, col, row))
+        for entity_id, col, row in level_data.spawns:
+            if entity_id != PLAYER_ID:
+                monster_name = entity_ids.get(entity_id, 'squid')
+                pos = (col * TILESIZE, row * TILESIZE)
+                self.get_state(col, row).enemies.append((monster_name, pos, monster_data[monster_name]['health']))
+
+    def get_state(self, col, row):
+        key = (col // STREAM_CHUNK_TILES, row // STREAM_CHUNK_TILES)
+        if key not in self.states:
+            self.states[key] = ChunkState()
+        return self.states[key]
+
+    def chunk_at(self, pos):
+        return int(pos[0]) // self.chunk_size, int(pos[1]) // self.chunk_size
+
+    def update(self, player_pos):
+        center = self.chunk_at(player_pos)
+        if center == self.center:
+            return
+        self.center = center
+        wanted = {(center[0] + x, center[1] + y)
+                  for x in range(-STREAM_RADIUS, STREAM_RADIUS + 1)
+                  for y in range(-STREAM_RADIUS, STREAM_RADIUS + 1)}
+
+        for key in [key for key in self.loaded if key not in wanted]:
+            self.unload_chunk(key)
+        # enemies belong to the chunk they are in now, not the one they
+        # spawned in, so they are parked wherever they walked to
+        for monster_name, pos, health in self.roster.collect(lambda pos: self.chunk_at(pos) in wanted):
+            self.get_state(pos[0] // TILESIZE, pos[1] // TILESIZE).enemies.append((monster_name, pos, health))
+        for key in wanted:
+            if key not in self.loaded and key in self.states:
+                self.load_chunk(key)
+
+    def load_chunk(self, key):
+        state = self.states[key]
+        sprites = []
+        for col, row in state.boundary:
+            sprites.append(self.create_tile('invisible', (col * TILESIZE, row * TILESIZE)))
+        for object_id, col, row in state.objects:
+            sprites.append(self.create_tile('object', (col * TILESIZE, row * TILESIZE), object_id))
+        self.loaded[key] = sprites
+
+        for monster_name, pos, health in state.enemies:
+            self.roster.spawn(monster_name, pos, health)
+        state.enemies = []
+
+    def unload_chunk(self, key):
+        for sprite in self.loaded.pop(key):
+            sprite.kill()
@@ -1,6 +1,10 @@
 import os
+import re
+import threading
+import weakref
 import pygame
 from csv import reader
+from collections import OrderedDict
 
 
 def get_path(path):
@@ -20,14 +24,179 @@ def import_csv_layout(path: str) -> list:
         return terrain_map
 
 
-def import_folder(path: str) -> list:
-    unique_path = get_path(path)
-    surface_list = []
+def surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def natural_key(name: str) -> list:
+    # '2.png' before '10.png', whatever order the filesystem lists them in
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+class AssetRegistry:
+    # one cache for the whole process: every image and frame folder is read
+    # and decoded once, after that spawning anything is a dictionary lookup
+    def __init__(self):
+        self.images = {}
+        self.folders = {}
+        self.keys = {}
+        self.blanks = {}
+        self.lock = threading.Lock()
+        self.pack = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # low memory mode: folders under these roots may be dropped again,
+        # least recently used first, once they take more than the budget
+        self.budget = None
+        self.evictable_roots = ()
+        self.evictable = OrderedDict()
+        self.evictable_bytes = 0
+
+        # mask hit mode: every frame gets its mask when it is loaded, and the
+        # mask goes away with the frame
+        self.masks = weakref.WeakKeyDictionary()
+        self.masks_enabled = False
+
+    def set_budget(self, budget: int, roots: list) -> None:
+        self.budget = budget
+        self.evictable_roots = tuple(os.path.normpath(get_path(root)) + os.sep for root in roots)
+
+    def use_pack(self, pack) -> None:
+        self.pack = pack
+
+    def is_evictable(self, folder: str) -> bool:
+        return self.budget is not None and folder.startswith(self.evictable_roots)
+
+    def use_masks(self) -> None:
+        with self.lock:
+            self.masks_enabled = True
+            for image in self.images.values():
+                self.add_mask(image)
+            for frames in self.folders.values():
+                for frame in frames:
+                    self.add_mask(frame)
+
+    def add_mask(self, surface: pygame.Surface) -> pygame.mask.Mask:
+        mask = self.masks.get(surface)
+        if mask is None:
+            mask = self.masks[surface] = pygame.mask.from_surface(surface)
+        return mask
+
+    def get_mask(self, surface: pygame.Surface) -> pygame.mask.Mask:
+        # surfaces made outside the registry (blanks) get theirs on first use
+        mask = self.masks.get(surface)
+        if mask is None:
+            with self.lock:
+                mask = self.add_mask(surface)
+        return mask
+
+    def load_image(self, path: str) -> pygame.Surface:
+        key = os.path.normpath(get_path(path))
+        image = self.images.get(key)
+        if image is None:
+            self.misses += 1
+            image = pygame.image.load(key).convert_alpha()
+            # assets may be decoded on loader threads, the first one wins
+            with self.lock:
+                image = self.images.setdefault(key, image)
+                if self.masks_enabled:
+                    self.add_mask(image)
+        else:
+            self.hits += 1
+        return image
+
+    def folder_key(self, path: str, flip: bool) -> tuple:
+        # the same relative paths are asked for every frame in low memory mode
+        key = self.keys.get((path, flip))
+        if key is None:
+            key = (os.path.normpath(get_path(path)), flip)
+            self.keys[(path, flip)] = key
+        return key
+
+    def import_folder(self, path: str, flip: bool = False) -> list:
+        key = self.folder_key(path, flip)
+        frames = self.folders.get(key)
+        if frames is None:
+            self.misses += 1
+            folder = key[0]
+            # evictable sets are decoded: pack frames are views into the mapped
+            # file, so dropping them would not bring the budget down
+            if self.pack is not None and not self.is_evictable(folder):
+                frames = self.pack.get_folder(folder, flip)
+            if frames is None and flip:
+                frames = [pygame.transform.flip(frame, True, False) for frame in self.import_folder(folder)]
+            elif frames is None:
+                names = sorted((name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name))),
+                               key=natural_key)
+                frames = [pygame.image.load(os.path.join(folder, name)).convert_alpha() for name in names]
+            with self.lock:
+                if key in self.folders:
+                    return self.folders[key]
+                self.folders[key] = frames
+                if self.masks_enabled:
+                    for frame in frames:
+                        self.add_mask(frame)
+                if self.is_evictable(folder):
+                    self.evictable[key] = sum(surface_bytes(frame) for frame in frames)
+                    self.evictable_bytes += self.evictable[key]
+                    self.enforce_budget()
+        else:
+            self.hits += 1
+            if key in self.evictable:
+                self.evictable.move_to_end(key)
+        return frames
+
+    def touch(self, path: str, flip: bool = False) -> None:
+        key = self.folder_key(path, flip)
+        if key in self.evictable:
+            self.evictable.move_to_end(key)
+
+    def enforce_budget(self) -> None:
+        # the most recently used set always stays, even when it alone is too big
+        while self.evictable_bytes > self.budget and len(self.evictable) > 1:
+            key, size = self.evictable.popitem(last=False)
+            del self.folders[key]
+            self.evictable_bytes -= size
+            self.evictions += 1
+
+    def blank(self, size: tuple) -> pygame.Surface:
+        # shared fully transparent surface, used to blink shared frames
+        surf = self.blanks.get(size)
+        if surf is None:
+            surf = pygame.Surface(size, pygame.SRCALPHA)
+            self.blanks[size] = surf
+        return surf
+
+    def memory_usage(self) -> dict:
+        # decoded pixels held by the registry; frames served from the pack
+        # are views into the mapped file and are counted as the pack instead
+        frames = {id(frame): frame for folder in self.folders.values() for frame in folder
+                  if frame.get_parent() is None}
+        return {
+            'images': sum(surface_bytes(image) for image in self.images.values()),
+            'frames': sum(surface_bytes(frame) for frame in frames.values()),
+            'evictable': self.evictable_bytes,
+            'pack': len(self.pack.map) if self.pack is not None else 0,
+        }
+
+    def stats(self) -> dict:
+        return {'images': len(self.images), 'folders': len(self.folders), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+assets = AssetRegistry()
+
+
+def load_image(path: str) -> pygame.Surface:
+    return assets.load_image(path)
+
+
+def import_folder(path: str, flip: bool = False) -> list:
+    return assets.import_folder(path, flip)
 
-    for _, __, img_files in os.walk(unique_path):
-        for image in img_files:
-            full_path = unique_path + '/' + image
-            image_surf = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image_surf)
 
-    return surface_list
+def masks_overlap(image: pygame.Surface, pos: tuple, other_image: pygame.Surface, other_pos: tuple) -> bool:
+    offset = (other_pos[0] - pos[0], other_pos[1] - pos[1])
+    return assets.get_mask(image).overlap(assets.get_mask(other_image), offset) is not None
@@ -4,7 +4,7 @@ from settings import *
 
 class Tile(pygame.sprite.Sprite):
     def __init__(self, pos, groups, sprite_type, surface=pygame.Surface((TILESIZE, TILESIZE))):
-        super().__init__(groups)
+        super().__init__()
         self.sprite_type = sprite_type
         y_offset = HITBOX_OFFSET[sprite_type]
         self.image = surface
@@ -15,3 +15,5 @@ class Tile(pygame.sprite.Sprite):
         else:
             self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(-10, y_offset)
+        # join the groups once the rects exist so indexed groups can place it
+        self.add(groups)
@@ -0,0 +1,175 @@
+import os
+import sys
+import gzip
+import zlib
+import base64
+from array import array
+from bisect import bisect_right
+import xml.etree.ElementTree as ElementTree
+from support import get_path
+
+# the top bits of a gid only say how the tile is flipped
+FLIP_FLAGS = 0xE0000000
+
+
+def decode_gids(element, data=None):
+    # chunks carry the tiles but their <data> parent says how they are stored
+    data = element if data is None else data
+    encoding = data.get('encoding')
+    if encoding == 'csv':
+        return [int(value) for value in element.text.split(',') if value.strip()]
+    if encoding == 'base64':
+        raw = base64.b64decode(element.text.strip())
+        compression = data.get('compression')
+        if compression == 'zlib':
+            raw = zlib.decompress(raw)
+        elif compression == 'gzip':
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f'unsupported tmx compression: {compression}')
+        gids = array('I', raw)
+        if sys.byteorder != 'little':
+            gids.byteswap()
+        return gids
+    return [int(tile.get('gid', 0)) for tile in element.findall('tile')]
+
+
+class ChunkedLayer:
+    # tile layer of an infinite map; a chunk is only decoded the first time
+    # one of its cells is read. With a firstgid only the tiles of that tileset
+    # are kept
+    def __init__(self, tmx_map, data, firstgid=None):
+        self.map = tmx_map
+        self.data = data
+        self.firstgid = firstgid
+        self.width = tmx_map.width
+        self.height = tmx_map.height
+        self.chunks = {}
+        self.decoded = {}
+        self.chunk_width = tmx_map.chunk_width
+        self.chunk_height = tmx_map.chunk_height
+        for chunk in data.findall('chunk'):
+            col = int(chunk.get('x')) - tmx_map.origin_col
+            row = int(chunk.get('y')) - tmx_map.origin_row
+            self.chunks[(col, row)] = chunk
+
+    def get_chunk(self, key):
+        cells = self.decoded.get(key)
+        if cells is None:
+            cells = array('h', (self.map.local_id(gid, self.firstgid) for gid in self.map.get_gids(self.chunks[key], self.data)))
+            self.decoded[key] = cells
+        return cells
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __getitem__(self, index):
+        row, col = divmod(index, self.width)
+        key = (col - col % self.chunk_width, row - row % self.chunk_height)
+        if key not in self.chunks:
+            return -1
+        return self.get_chunk(key)[(row - key[1]) * self.chunk_width + col - key[0]]
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def cells(self):
+        # only walks the chunks the map actually has, still in row order
+        bands = {}
+        for key in sorted(self.chunks):
+            bands.setdefault(key[1], []).append(key)
+        for band_row in sorted(bands):
+            for row in range(self.chunk_height):
+                for key in bands[band_row]:
+                    start = row * self.chunk_width
+                    for col, value in enumerate(self.get_chunk(key)[start:start + self.chunk_width]):
+                        if value != -1:
+                            yield key[0] + col, band_row + row, value
+
+
+class TmxMap:
+    def __init__(self, path):
+        path = get_path(path)
+        root = ElementTree.parse(path).getroot()
+        self.tile_width = int(root.get('tilewidth'))
+        self.tile_height = int(root.get('tileheight'))
+        self.infinite = root.get('infinite') == '1'
+
+        # tilesets by first gid, with the .tsx file of each external one
+        self.firstgids = []
+        self.sources = {}
+        for tileset in root.findall('tileset'):
+            firstgid = int(tileset.get('firstgid'))
+            self.firstgids.append(firstgid)
+            if tileset.get('source'):
+                self.sources[firstgid] = os.path.normpath(os.path.join(os.path.dirname(path), tileset.get('source')))
+        self.firstgids.sort()
+        # raw gids of every <data> or <chunk> decoded so far, shared by the
+        # layers that split one tile layer by tileset
+        self.gids = {}
+
+        # root.iter also finds layers nested in group layers
+        self.layers = {layer.get('name'): layer for layer in root.iter('layer')}
+        self.object_groups = {group.get('name'): group for group in root.iter('objectgroup')}
+
+        if self.infinite:
+            chunks = [chunk for layer in self.layers.values() for chunk in layer.iter('chunk')]
+            self.chunk_width = int(chunks[0].get('width')) if chunks else 16
+            self.chunk_height = int(chunks[0].get('height')) if chunks else 16
+            self.origin_col = min((int(chunk.get('x')) for chunk in chunks), default=0)
+            self.origin_row = min((int(chunk.get('y')) for chunk in chunks), default=0)
+            self.width = max((int(chunk.get('x')) + int(chunk.get('width')) for chunk in chunks), default=0) - self.origin_col
+            self.height = max((int(chunk.get('y')) + int(chunk.get('height')) for chunk in chunks), default=0) - self.origin_row
+        else:
+            self.origin_col = self.origin_row = 0
+            self.width = int(root.get('width'))
+            self.height = int(root.get('height'))
+
+    def get_gids(self, element, data):
+        gids = self.gids.get(element)
+        if gids is None:
+            gids = self.gids[element] = decode_gids(element, data)
+        return gids
+
+    def first_gid(self, gid):
+        gid &= ~FLIP_FLAGS
+        if gid == 0 or not self.firstgids:
+            return None
+        return self.firstgids[bisect_right(self.firstgids, gid) - 1]
+
+    def local_id(self, gid, firstgid=None):
+        # same numbering as the csv export: the tile index inside its tileset;
+        # with a firstgid, tiles of other tilesets read as empty
+        first = self.first_gid(gid)
+        if first is None or firstgid is not None and first != firstgid:
+            return -1
+        return (gid & ~FLIP_FLAGS) - first
+
+    def get_layer(self, name, firstgid=None):
+        data = self.layers[name].find('data')
+        if self.infinite:
+            return ChunkedLayer(self, data, firstgid)
+        return array('h', (self.local_id(gid, firstgid) for gid in self.get_gids(data, data)))
+
+    def get_tilesets(self, name):
+        # (first gid, .tsx path) of every tileset the layer is painted from
+        data = self.layers[name].find('data')
+        elements = data.findall('chunk') if self.infinite else [data]
+        used = {self.first_gid(gid) for element in elements for gid in self.get_gids(element, data)}
+        used.discard(None)
+        for firstgid in used:
+            if firstgid not in self.sources:
+                raise ValueError(f'tile layer {name} uses an embedded tileset, save it as a .tsx file')
+        return [(firstgid, self.sources[firstgid]) for firstgid in sorted(used)]
+
+    def get_placements(self, name):
+        # tile objects are anchored at their bottom left corner; the placement
+        # row is the one the csv layers would use for the same object
+        placements = []
+        for tile_object in self.object_groups[name].findall('object'):
+            if tile_object.get('gid') is None:
+                continue
+            col = int(float(tile_object.get('x'))) // self.tile_width - self.origin_col
+            row = int(float(tile_object.get('y'))) // self.tile_height - 1 - self.origin_row
+            placements.append((self.local_id(int(tile_object.get('gid'))), col, row))
+        return placements
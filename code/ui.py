@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from support import load_image
 
 
 class UI:
@@ -19,14 +20,14 @@ class UI:
         self.weapon_graphics = []
         for weapon in weapon_data.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = load_image(path)
             self.weapon_graphics.append(weapon)
 
         # convert magic dictionary
         self.magic_graphics = []
         for magic in magic_data.values():
             path = magic['graphic']
-            magic = pygame.image.load(path).convert_alpha()
+            magic = load_image(path)
             self.magic_graphics.append(magic)
 
     def show_bar(self, current, max_amount, bg_rect, color):
@@ -1,5 +1,5 @@
 import pygame
-from support import get_path
+from support import load_image
 
 
 class Weapon(pygame.sprite.Sprite):
@@ -9,9 +9,7 @@ class Weapon(pygame.sprite.Sprite):
         direction = player.status.split('_')[0]  # cut '_idle'
 
         # graphic
-        full_path = get_path(
-            f'../graphics/weapons/{player.weapon}/{direction}.png')
-        self.image = pygame.image.load(full_path).convert_alpha()
+        self.image = load_image(f'../graphics/weapons/{player.weapon}/{direction}.png')
 
         # placement
         if direction == 'right':
@@ -0,0 +1,4 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<tileset version="1.8" tiledversion="1.8.2" name="details" tilewidth="64" tileheight="64" tilecount="80" columns="16">
+ <image source="../../graphics/tilemap/details.png" width="1024" height="320"/>
+</tileset>